@@ -0,0 +1,196 @@
+# Grafana alert webhook receiver.
+#
+# Runs a small aiohttp web server that accepts Grafana (unified alerting) webhook payloads, drops alerts
+# already seen with the same fingerprint and status, and batches bursts into one Discord message per
+# time window. Firing alerts that reference a panel get the panel image attached.
+
+import asyncio
+import hmac
+import time
+from urllib.parse import parse_qs, urlparse
+
+import aiohttp
+import discord
+from aiohttp import web
+
+from core.health import BackendError, BackendUnavailable
+
+# Discord limits a message to 10 attachments and an embed to 25 fields
+MAX_ALERT_ATTACHMENTS = 10
+MAX_ALERT_FIELDS = 25
+
+
+def panel_reference(alert: dict):
+    """Finds the dashboard uid and panel id an alert was raised from
+    :param alert: A single alert from the Grafana webhook payload
+    :return: A (dashboard_uid, panel_id) tuple, or None if the alert is not linked to a panel
+    """
+    annotations = alert.get("annotations", {})
+    dashboard_uid = annotations.get("__dashboardUid__")
+    panel_id = annotations.get("__panelId__")
+    if not (dashboard_uid and panel_id) and alert.get("panelURL"):
+        # panelURL looks like https://grafana/d/<uid>/<slug>?orgId=1&viewPanel=<id>
+        url = urlparse(alert["panelURL"])
+        path = url.path.split("/")
+        if "d" in path and path.index("d") + 1 < len(path):
+            dashboard_uid = path[path.index("d") + 1]
+        panel_id = parse_qs(url.query).get("viewPanel", [None])[0]
+    if dashboard_uid and panel_id:
+        return dashboard_uid, str(panel_id)
+    return None
+
+
+class GrafanaAlertReceiver:
+    """Accepts Grafana alert webhooks, deduplicates them by fingerprint and posts them in batches"""
+
+    def __init__(
+        self,
+        cog,
+        channel_id: int,
+        host: str = "127.0.0.1",
+        port: int = 8465,
+        token: str = None,
+        batch_seconds: float = 30,
+        dedupe_seconds: float = 900,
+    ):
+        self.cog = cog
+        self.logger = cog.logger
+        self.channel_id = channel_id
+        self.host = host
+        self.port = port
+        self.token = token
+        self.batch_seconds = batch_seconds
+        self.dedupe_seconds = dedupe_seconds
+        # fingerprint -> (status, monotonic time last posted)
+        self.seen = {}
+        # fingerprint -> alert, the latest status of an alert within the current window wins
+        self.pending = {}
+        self._flush_task = None
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/grafana/alerts", self.handle_webhook)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.logger.info(f"Grafana alert webhook listening on http://{self.host}:{self.port}/grafana/alerts")
+
+    async def stop(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _authorized(self, request: web.Request) -> bool:
+        if not self.token:
+            return True
+        supplied = request.headers.get("Authorization", "")
+        return hmac.compare_digest(supplied, f"Bearer {self.token}")
+
+    async def handle_webhook(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            return web.Response(status=401)
+        try:
+            payload = await request.json()
+        except ValueError:
+            return web.Response(status=400, text="Invalid json")
+        alerts = payload.get("alerts", []) if isinstance(payload, dict) else None
+        if not isinstance(alerts, list):
+            return web.Response(status=400, text="Expected an object with a list of alerts")
+        accepted = self.enqueue(alerts)
+        return web.json_response({"accepted": accepted})
+
+    def enqueue(self, alerts: list) -> int:
+        """Adds new alerts to the current batch, starting the batch window if needed
+        :param alerts: The alerts from a webhook payload
+        :return: The number of alerts accepted after deduplication
+        """
+        now = time.monotonic()
+        # forget fingerprints that have aged out of the dedupe window
+        self.seen = {
+            fingerprint: entry
+            for fingerprint, entry in self.seen.items()
+            if now - entry[1] < self.dedupe_seconds
+        }
+        accepted = 0
+        for alert in alerts:
+            if not isinstance(alert, dict):
+                continue
+            fingerprint = alert.get("fingerprint") or str(sorted(alert.get("labels", {}).items()))
+            # an alert without a status is firing, stored on the alert so post_batch reads it the same way
+            status = alert.get("status") or "firing"
+            alert = {**alert, "status": status}
+            previous = self.seen.get(fingerprint)
+            if previous is not None and previous[0] == status:
+                continue
+            self.seen[fingerprint] = (status, now)
+            self.pending[fingerprint] = alert
+            accepted += 1
+        if self.pending and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+        return accepted
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.batch_seconds)
+        alerts = list(self.pending.values())
+        self.pending.clear()
+        try:
+            await self.post_batch(alerts)
+        except Exception as e:
+            self.logger.error(f"Error posting Grafana alert batch: {e}")
+
+    async def post_batch(self, alerts: list):
+        """Posts one message for a batch of alerts, attaching the panels of the firing ones"""
+        await self.cog.bot.wait_until_ready()
+        channel = self.cog.bot.get_channel(self.channel_id)
+        if channel is None:
+            channel = await self.cog.bot.fetch_channel(self.channel_id)
+
+        firing = [alert for alert in alerts if alert.get("status") == "firing"]
+        resolved = [alert for alert in alerts if alert.get("status") != "firing"]
+        embed = discord.Embed(
+            title=f"Grafana alerts: {len(firing)} firing, {len(resolved)} resolved",
+            color=discord.Color.red() if firing else discord.Color.green(),
+        )
+        for alert in (firing + resolved)[:MAX_ALERT_FIELDS]:
+            labels = alert.get("labels", {})
+            annotations = alert.get("annotations", {})
+            icon = "🔥" if alert.get("status") == "firing" else "✅"
+            summary = annotations.get("summary") or annotations.get("description") or alert.get("valueString", "")
+            embed.add_field(
+                name=f"{icon} {labels.get('alertname', 'Alert')}"[:256],
+                value=(summary or "\u200b")[:1024],
+                inline=False,
+            )
+        if len(alerts) > MAX_ALERT_FIELDS:
+            embed.set_footer(text=f"...and {len(alerts) - MAX_ALERT_FIELDS} more")
+
+        files = []
+        rendered_panels = set()
+        for alert in firing:
+            reference = panel_reference(alert)
+            if reference is None or reference in rendered_panels:
+                continue
+            if len(files) >= MAX_ALERT_ATTACHMENTS:
+                break
+            rendered_panels.add(reference)
+            try:
+                panel_file = await self.cog.fetch_rendered_panel_by_id(
+                    *reference, filename=f"alert_panel_{len(files) + 1}.png"
+                )
+            except BackendUnavailable as e:
+                # the alert itself matters more than its panels, post it without images
+                self.logger.warning(f"Skipping alert panels: {e}")
+                break
+            except (aiohttp.ClientError, BackendError) as e:
+                self.logger.error(f"Failed to render alert panel {reference}: {e}")
+                continue
+            if panel_file:
+                files.append(panel_file)
+
+        await channel.send(embed=embed, files=files)
+        self.logger.info(
+            f"Posted Grafana alert batch: {len(firing)} firing, {len(resolved)} resolved, {len(files)} panels"
+        )
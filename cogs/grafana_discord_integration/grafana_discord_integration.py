@@ -1,27 +1,32 @@
 import discord
-from dotenv import load_dotenv
 import asyncio
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord.ui import View, Button
 from json import JSONDecodeError
-from io import BytesIO
 import os
 import aiohttp
 import json
 from discord import Button, ButtonStyle, InteractionType
-from typing import List
-
-# * Define the intents for the bot (this is required for the discord-py-slash-commands library))
-intents = discord.Intents.default()
-intents.message_content = True
-intents.messages = True
-intents.guilds = True
-intents.reactions = True
-intents.members = True
+from typing import List, Literal
+from datetime import datetime, timezone
+from .grafana_reports import GrafanaReport, ReportStore, perceptual_hash_bytes
+from .grafana_alerts import GrafanaAlertReceiver
+from .render_buffer import RenderTooLarge, spool_response
+from .grafana_render import (
+    RenderCache,
+    RenderOptions,
+    build_render_url,
+    parse_variables,
+)
+from .panel_list import PanelListView, build_panel_pages
+from io import BytesIO
+import time
+from core.health import BackendError, BackendUnavailable
 
-# * Load the .env to get the discord and grafana tokens
-load_dotenv()
+# * Gateway intents this cog needs, the bot connects with the union of every cog's
+# guilds keeps the channel cache the alert and report posts look channels up in
+REQUIRED_INTENTS = discord.Intents(guilds=True)
 
 # section Code defining the Cog and its attributes/functions
 
@@ -30,7 +35,7 @@ class Grafana_Discord_Integration_Cog(commands.Cog):
     def __init__(self, bot):
         """Initializes the cog and sets up the Grafana API integration"""
         self.bot = bot
-        self.logger = bot.logger
+        self.logger = bot.logger.getChild("grafana_discord_integration")
         # todo dynamic dashboard names: If possible, get a list of the dashboard names from the grafana API
         self.dashboard_names = [
             "minecraft-deep-dive-dashboard",
@@ -38,15 +43,125 @@ class Grafana_Discord_Integration_Cog(commands.Cog):
         ]
         self.panels = {}
         self.load_panel_config()
+        # on a reload the previous instance hands over its warm caches and the running alert receiver
+        handoff = bot.handoff.receive(self)
         self.panel_source = os.getenv("GRAFANA_PANEL_SOURCE")
         self.grafana_uid = os.getenv("GRAFANA_UID")
         self.grafana_url = os.getenv("GRAFANA_URL")
+        # renders stay in memory below the spool size and are spilled to a temporary file above it
+        self.render_spool_bytes = int(float(os.getenv("GRAFANA_RENDER_SPOOL_MB", "4")) * 1024 * 1024)
+        self.render_max_bytes = int(float(os.getenv("GRAFANA_RENDER_MAX_MB", "25")) * 1024 * 1024)
+        # keyed by normalized render url, so equivalent requests share a render
+        self.render_cache = handoff.get(
+            "render_cache",
+            lambda: RenderCache(
+                ttl_seconds=float(os.getenv("GRAFANA_RENDER_CACHE_SECONDS", "60")),
+                max_bytes=int(float(os.getenv("GRAFANA_RENDER_CACHE_MB", "32")) * 1024 * 1024),
+            ),
+        )
+        # renders can take a while on big dashboards, so Grafana gets a longer timeout than the other backends
+        self.breaker = bot.health.register(
+            "grafana", timeout=float(os.getenv("GRAFANA_TIMEOUT_SECONDS", "60"))
+        )
+        # the dashboard render has always sent these variables, user supplied values override them
+        self.dashboard_default_variables = {"machine": [""], "ideal": ["12"]}
+        # dashboard uid -> (monotonic expiry, {variable name: [values]})
+        self.template_variables = handoff.get("template_variables", dict)
+        # after a restart, renders and dashboard variables that are still fresh come from the last snapshot
+        bot.snapshots.register(
+            "grafana_render_cache",
+            1,
+            self.render_cache.dump,
+            self.render_cache.restore,
+            restore="render_cache" not in handoff.taken,
+        )
+        bot.snapshots.register(
+            "grafana_template_variables",
+            1,
+            self._dump_template_variables,
+            self._restore_template_variables,
+            restore="template_variables" not in handoff.taken,
+        )
         self.load_panel_config()
+        self.reports = ReportStore(
+            os.getenv("GRAFANA_REPORTS_PATH", "grafana_reports.json"), self.logger
+        )
+        self.reports.load()
+        # in a sharded bot only the primary process posts reports and receives alerts
+        if bot.primary:
+            self.run_due_reports.start()
+        self.alert_receiver = handoff.get("alert_receiver", lambda: None)
+        # the cache hit ratio is hits / (hits + misses), computed in Grafana from the two counters
+        bot.metrics.source(
+            "qcbot_grafana_render_cache_hits_total",
+            "Renders served from the render cache",
+            lambda: self.render_cache.hits,
+            kind="counter",
+        )
+        bot.metrics.source(
+            "qcbot_grafana_render_cache_misses_total",
+            "Renders requested from Grafana",
+            lambda: self.render_cache.misses,
+            kind="counter",
+        )
+        bot.metrics.source(
+            "qcbot_grafana_alerts_pending",
+            "Alerts waiting for the current batch window",
+            lambda: len(self.alert_receiver.pending) if self.alert_receiver else 0,
+        )
+
+    async def cog_load(self):
+        """Starts the Grafana alert webhook receiver when an alert channel is configured"""
+        if self.alert_receiver is not None:
+            # handed off by the previous instance, still listening and holding its pending batch
+            self.alert_receiver.cog = self
+            self.alert_receiver.logger = self.logger
+            return
+        alert_channel_id = os.getenv("GRAFANA_ALERT_CHANNEL_ID")
+        if alert_channel_id and self.bot.primary:
+            self.alert_receiver = GrafanaAlertReceiver(
+                self,
+                channel_id=int(alert_channel_id),
+                host=os.getenv("GRAFANA_ALERT_WEBHOOK_HOST", "127.0.0.1"),
+                port=int(os.getenv("GRAFANA_ALERT_WEBHOOK_PORT", "8465")),
+                token=os.getenv("GRAFANA_ALERT_WEBHOOK_TOKEN"),
+                batch_seconds=float(os.getenv("GRAFANA_ALERT_BATCH_SECONDS", "30")),
+                dedupe_seconds=float(os.getenv("GRAFANA_ALERT_DEDUPE_SECONDS", "900")),
+            )
+            await self.alert_receiver.start()
+
+    def _dump_template_variables(self) -> dict:
+        now = time.monotonic()
+        return {
+            uid: [expires - now, variables]
+            for uid, (expires, variables) in self.template_variables.items()
+            if expires > now
+        }
+
+    def _restore_template_variables(self, data: dict, saved_at: float):
+        elapsed = time.time() - saved_at
+        for uid, (seconds_left, variables) in data.items():
+            if seconds_left - elapsed > 0:
+                self.template_variables[uid] = (time.monotonic() + seconds_left - elapsed, variables)
+
+    def handoff_export(self) -> dict:
+        """The resources a reloaded instance takes over instead of starting cold"""
+        resources = {"render_cache": self.render_cache, "template_variables": self.template_variables}
+        if self.alert_receiver is not None:
+            resources["alert_receiver"] = self.alert_receiver
+        return resources
+
+    async def cog_unload(self):
+        self.run_due_reports.cancel()
+        self.bot.metrics.remove_sources("qcbot_grafana_")
+        await self.bot.snapshots.save("grafana_", forget=True)
+        if self.alert_receiver is not None and not self.bot.handoff.holds(self.alert_receiver):
+            await self.alert_receiver.stop()
 
     async def panel_autocomplete(
         self, interaction: discord.Interaction, current: str
     ) -> List[app_commands.Choice[str]]:
-        print("autocomplete invoked")
+        self.logger.debug("autocomplete invoked")
         return [
             app_commands.Choice(name=panel, value=panel)
             for panel in self.panels
@@ -106,6 +221,8 @@ class Grafana_Discord_Integration_Cog(commands.Cog):
             json_modal = json.load(file)
             self.extract_panel_config(json_modal, self.panels)
             self.logger.info(f"Panel names and ids extracted from {jsonconfig_path}")
+        # the listing pages only change with the catalog, so they are built here rather than per command
+        self.panel_pages = build_panel_pages(list(self.panels))
 
     def extract_panel_config(self, jsonconfig, panels, parent_id=None):
         """Recursively extracts the panel names and ids from the json modal and stores them in a dictionary
@@ -125,45 +242,117 @@ class Grafana_Discord_Integration_Cog(commands.Cog):
                 self.extract_panel_config(item, panels, parent_id)
 
     # section Helper functions for requesting the panel and dashboard images from the Grafana API render engine
-    async def fetch_rendered_panel(self, panel_name):
+    async def fetch_rendered_panel(
+        self,
+        panel_name,
+        width: int = None,
+        height: int = None,
+        options: RenderOptions = None,
+    ):
         """Fetches the panel image from the Grafana API and sends it to the Discord channel
         :param panel_name: The name of the panel to fetch
+        :param width: Optional width of the panel image
+        :param height: Optional height of the panel image
+        :param options: Time range, timezone, org, theme and template variables, defaults to the last hour
         :return: A discord.File object containing the panel image
         """
         panel_id = self.panels.get(panel_name)
         if panel_id is not None:
-            api_key = os.getenv("GRAFANA_API_TOKEN")
-            panel_source = self.panel_source
-            grafana_url = self.grafana_url
-            grafana_uid = self.grafana_uid
-            grafana_api_url = f"https://{grafana_url}/render/d-solo/{grafana_uid}/{panel_source}?orgId=1&panelId={panel_id}"
-            headers = {"Authorization": f"Bearer {api_key}", "Accept": "image/png"}
-            async with aiohttp.ClientSession() as session:
-                self.logger.info(f"Fetching panel: {panel_name}")
-                async with session.get(
-                    grafana_api_url, headers=headers
-                ) as api_response:
-                    if api_response.status == 200:
-                        content = await api_response.read()
-                        image_stream = BytesIO(content)
-                        image_stream.seek(0)
+            grafana_api_url = build_render_url(
+                self.grafana_url,
+                f"render/d-solo/{self.grafana_uid}/{self.panel_source}",
+                {"panelId": panel_id, "width": width, "height": height},
+                options or RenderOptions(),
+            )
+            return await self._fetch_render(
+                grafana_api_url, f"panel: {panel_name}", "rendered_panel.png"
+            )
+
+    async def fetch_rendered_panel_by_id(
+        self,
+        dashboard_uid: str,
+        panel_id: int,
+        options: RenderOptions = None,
+        filename: str = "rendered_panel.png",
+    ):
+        """Fetches a panel image by dashboard uid and panel id, used where only the ids are known (e.g. alerts)
+        :param dashboard_uid: The uid of the dashboard containing the panel
+        :param panel_id: The id of the panel to fetch
+        :param options: Time range, timezone, org, theme and template variables, defaults to the last hour
+        :param filename: The attachment filename for the image
+        :return: A discord.File object containing the panel image
+        """
+        grafana_api_url = build_render_url(
+            self.grafana_url,
+            f"render/d-solo/{dashboard_uid}/{self.panel_source}",
+            {"panelId": panel_id},
+            options or RenderOptions(),
+        )
+        return await self._fetch_render(
+            grafana_api_url, f"panel id {panel_id} on {dashboard_uid}", filename
+        )
+
+    async def _fetch_render(self, grafana_api_url: str, description: str, filename: str):
+        """Requests an image from the Grafana render engine, answering from the render cache when possible
+        :param grafana_api_url: The normalized render url, also used as the cache key
+        :param description: What is being rendered, for logging
+        :param filename: The attachment filename for the image
+        :return: A discord.File object containing the image, or None if the render failed
+        """
+        # Requests for the same url wait on each other so only the first one reaches the render engine
+        try:
+            async with self.render_cache.lock(grafana_api_url):
+                cached = self.render_cache.get(grafana_api_url)
+                if cached is not None:
+                    self.logger.info(f"Serving {description} from the render cache")
+                    return discord.File(BytesIO(cached), filename=filename)
+                return await self.breaker.call(self._request_render, grafana_api_url, description, filename)
+        finally:
+            self.render_cache.release(grafana_api_url)
 
-                        self.logger.info("Panel image prepared for Discord channel")
-                        return discord.File(image_stream, filename="rendered_panel.png")
-                    else:
-                        self.logger.error(
-                            f"Failed to fetch panel: {api_response.status}"
+    async def _request_render(self, grafana_api_url: str, description: str, filename: str):
+        api_key = os.getenv("GRAFANA_API_TOKEN")
+        headers = {"Authorization": f"Bearer {api_key}", "Accept": "image/png"}
+        # Send the request to the Grafana API and stream the content into a spooled buffer which we can pass to discord as a file.
+        async with aiohttp.ClientSession() as session:
+            self.logger.info(f"Fetching {description}")
+            async with session.get(grafana_api_url, headers=headers) as api_response:
+                if api_response.status == 200:
+                    try:
+                        image_stream = await spool_response(
+                            api_response, self.render_spool_bytes, self.render_max_bytes
                         )
+                    except RenderTooLarge as e:
+                        self.logger.error(f"Failed to fetch {description}: {e}")
+                        return None
+                    # only renders small enough to stay in memory are cached, spilled ones are served once. The
+                    # buffer is swapped for one bytes object that the cache and this send share, BytesIO over
+                    # bytes doesn't copy them
+                    if isinstance(image_stream, BytesIO):
+                        content = image_stream.getvalue()
+                        image_stream.close()
+                        self.render_cache.put(grafana_api_url, content)
+                        image_stream = BytesIO(content)
+                    self.logger.info(f"Image of {description} prepared for Discord channel")
+                    return discord.File(image_stream, filename=filename)
+                elif api_response.status >= 500:
+                    # raised rather than returned so the circuit breaker counts it
+                    raise BackendError(f"Grafana returned {api_response.status} for {description}")
+                else:
+                    self.logger.error(
+                        f"Failed to fetch {description}: {api_response.status}"
+                    )
 
-    async def fetch_rendered_multipanel(self, panel_names):
+    async def fetch_rendered_multipanel(self, panel_names, options: RenderOptions = None):
         """Performs the same API request as fetch_rendered_panel but for multiple panels, seperated by commas in panel_names interacton
         :param panel_names: A list of panel names to fetch
+        :param options: Time range, timezone, org, theme and template variables shared by all panels
         :return: A list of discord.File objects containing the panel images
         """
         panel_files = []
         for panel_name in panel_names:
             # Strip the panel names for looping the panel request
-            panel_file = await self.fetch_rendered_panel(panel_name.strip())
+            panel_file = await self.fetch_rendered_panel(panel_name.strip(), options=options)
             if panel_file:
                 # Add the panel file to the list penel_files
                 panel_files.append(panel_file)
@@ -181,33 +370,114 @@ class Grafana_Discord_Integration_Cog(commands.Cog):
         ]
 
     async def fetch_rendered_dashboard(
-        self, dashboard_name: str, width: int, height: int
+        self,
+        dashboard_name: str,
+        width: int,
+        height: int,
+        options: RenderOptions = None,
     ):
         """Fetches the dashboard image from the Grafana API and sends it to the Discord channel
         :param dashboard_name: The name of the dashboard to fetch
         :param width: The width of the dashboard image
         :param height: The height of the dashboard image
+        :param options: Time range, timezone, org, theme and template variables, defaults to the last hour
         :return: A discord.File object containing the dashboard image
         """
+        options = (options or RenderOptions()).with_default_variables(
+            self.dashboard_default_variables
+        )
+        grafana_api_url = build_render_url(
+            self.grafana_url,
+            f"render/d/{self.grafana_uid}/{dashboard_name}",
+            {"width": width, "height": height, "kiosk": "tv"},
+            options,
+        )
+        return await self._fetch_render(
+            grafana_api_url, f"dashboard: {dashboard_name}", "rendered_dashboard.png"
+        )
+
+    async def fetch_template_variables(self, dashboard_uid: str) -> dict:
+        """Fetches the template variable definitions of a dashboard, cached for a few minutes
+        :param dashboard_uid: The uid of the dashboard
+        :return: A dictionary of variable name to the list of values Grafana offers for it
+        """
+        cached = self.template_variables.get(dashboard_uid)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
         api_key = os.getenv("GRAFANA_API_TOKEN")
-        grafana_url = self.grafana_url
-        grafana_uid = self.grafana_uid
-        grafana_api_url = f"https://{grafana_url}/render/d/{grafana_uid}/{dashboard_name}?orgId=1&width={width}&height={height}&kiosk=tv&from=now-1h&to=now&var-machine=&var-ideal=12"
-        headers = {"Authorization": f"Bearer {api_key}", "Accept": "image/png"}
-        # Send the request to the Grafana API and stream the content to a BytesIO object which we can pass to discord as a file.
+        headers = {"Authorization": f"Bearer {api_key}", "Accept": "application/json"}
+        url = f"https://{self.grafana_url}/api/dashboards/uid/{dashboard_uid}"
+        variables = {}
+        data = await self.breaker.call(self._request_json, url, headers)
+        if data is None:
+            self.logger.error(f"Failed to fetch template variables for {dashboard_uid}")
+            return cached[1] if cached else {}
+        for variable in data.get("dashboard", {}).get("templating", {}).get("list", []):
+            values = [str(option.get("value")) for option in variable.get("options", [])]
+            current = variable.get("current", {}).get("value")
+            for value in current if isinstance(current, list) else [current]:
+                if value is not None and str(value) not in values:
+                    values.append(str(value))
+            variables[variable.get("name")] = values
+        self.template_variables[dashboard_uid] = (time.monotonic() + 300, variables)
+        return variables
+
+    async def _request_json(self, url: str, headers: dict):
         async with aiohttp.ClientSession() as session:
-            async with session.get(grafana_api_url, headers=headers) as api_response:
-                self.logger.info(f"Fetching dashboard: {dashboard_name}")
-                if api_response.status == 200:
-                    content = await api_response.read()
-                    image_stream = BytesIO(content)
-                    image_stream.seek(0)
-                    self.logger.info("Dashboard image prepared for Discord channel")
-                    return discord.File(image_stream, filename="rendered_dashboard.png")
-                else:
-                    self.logger.error(
-                        f"Failed to fetch dashboard: {api_response.status}"
-                    )
+            async with session.get(url, headers=headers) as api_response:
+                if api_response.status >= 500:
+                    raise BackendError(f"Grafana returned {api_response.status} for {url}")
+                if api_response.status != 200:
+                    return None
+                return await api_response.json()
+
+    async def variables_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> List[app_commands.Choice[str]]:
+        """Completes the last name=value pair of the variables option from the dashboard's template variables"""
+        try:
+            variables = await self.fetch_template_variables(self.grafana_uid)
+        except (aiohttp.ClientError, BackendError, BackendUnavailable) as e:
+            self.logger.error(f"Template variable autocomplete failed: {e}")
+            return []
+        prefix, _, last = current.rpartition(",")
+        prefix = f"{prefix}," if prefix else ""
+        if "=" in last:
+            name, _, partial = last.partition("=")
+            suggestions = [
+                f"{prefix}{name.strip()}={value}"
+                for value in variables.get(name.strip(), [])
+                if partial.strip().lower() in value.lower()
+            ]
+        else:
+            suggestions = [
+                f"{prefix}{name}="
+                for name in variables
+                if last.strip().lower() in name.lower()
+            ]
+        return [
+            app_commands.Choice(name=suggestion[:100], value=suggestion[:100])
+            for suggestion in suggestions[:25]
+        ]
+
+    @staticmethod
+    def render_options(
+        time_from: str,
+        time_to: str,
+        timezone: str,
+        org_id: int,
+        theme: str,
+        variables: str,
+    ) -> RenderOptions:
+        """Builds RenderOptions from the command options, raising ValueError for malformed input"""
+        return RenderOptions(
+            time_from=time_from,
+            time_to=time_to,
+            timezone=timezone,
+            org_id=org_id,
+            theme=theme,
+            variables=parse_variables(variables),
+        )
 
     # section Start of Discord bot commands. This command structure is based on the discord-py-slash-commands library
 
@@ -222,23 +492,36 @@ class Grafana_Discord_Integration_Cog(commands.Cog):
     )
 
     @grafana.command(name="dashboard", description="Display a Grafana dashboard")
+    @app_commands.autocomplete(variables=variables_autocomplete)
     async def grafana_dashboard(
         self,
         Interaction: discord.Interaction,
         dashboard_name: str,
         width: int = 1800,
         height: int = 1200,
+        time_from: str = "now-1h",
+        time_to: str = "now",
+        timezone: str = None,
+        org_id: int = 1,
+        theme: Literal["light", "dark"] = None,
+        variables: str = None,
     ):
         """Display a Grafana dashboard
-        Usage: /grafana dashboard [dashboard_name] [width] [height]
+        Usage: /grafana dashboard [dashboard_name] [width] [height] [time_from] [time_to] [timezone] [org_id] [theme] [variables]
+        variables are name=value pairs separated by commas, e.g. machine=server1,ideal=12
         """
-        print("Command invoked: grafana_dashboard")  # Debug print
+        self.logger.debug("Command invoked: grafana_dashboard")
         if Interaction.response.is_done():
             return
+        try:
+            options = self.render_options(time_from, time_to, timezone, org_id, theme, variables)
+        except ValueError as e:
+            await Interaction.response.send_message(f"Invalid render options: {e}", ephemeral=True)
+            return
         await Interaction.response.defer()
         try:
             dashboard_data = await self.fetch_rendered_dashboard(
-                dashboard_name, width, height
+                dashboard_name, width, height, options
             )
             if dashboard_data:
                 await Interaction.followup.send(file=dashboard_data)
@@ -249,6 +532,8 @@ class Grafana_Discord_Integration_Cog(commands.Cog):
                 await Interaction.followup.send(
                     "Failed to fetch the dashboard. Please check the dashboard name and try again."
                 )
+        except BackendUnavailable as e:
+            await Interaction.followup.send(f"⛔ {e}")
         except Exception as e:
             await Interaction.followup.send(
                 "An error occurred while fetching the dashboard."
@@ -257,30 +542,63 @@ class Grafana_Discord_Integration_Cog(commands.Cog):
 
     # Fetches the panel image from the Grafana API and sends it to the Discord channel
     @grafana.command(name="panel", description="Display a Grafana panel")
-    @app_commands.autocomplete(panel_name=panel_autocomplete)
-    async def grafana_panel(self, interaction: discord.Interaction, panel_name: str):
+    @app_commands.autocomplete(
+        panel_name=panel_autocomplete, variables=variables_autocomplete
+    )
+    async def grafana_panel(
+        self,
+        interaction: discord.Interaction,
+        panel_name: str,
+        width: int = None,
+        height: int = None,
+        time_from: str = "now-1h",
+        time_to: str = "now",
+        timezone: str = None,
+        org_id: int = 1,
+        theme: Literal["light", "dark"] = None,
+        variables: str = None,
+    ):
         """Display a Grafana panel
-        Usage: /grafana panel [panel_name]
+        Usage: /grafana panel [panel_name] [width] [height] [time_from] [time_to] [timezone] [org_id] [theme] [variables]
+        variables are name=value pairs separated by commas, e.g. machine=server1,ideal=12
         """
-        print("Command invoked: grafana_panel")  # Debug print
+        self.logger.debug("Command invoked: grafana_panel")
         if interaction.response.is_done():
             pass
             return
+        try:
+            options = self.render_options(time_from, time_to, timezone, org_id, theme, variables)
+        except ValueError as e:
+            await interaction.response.send_message(f"Invalid render options: {e}", ephemeral=True)
+            return
+        await self.send_panel(interaction, panel_name, width, height, options)
+
+    async def send_panel(
+        self,
+        interaction: discord.Interaction,
+        panel_name: str,
+        width: int = None,
+        height: int = None,
+        options: RenderOptions = None,
+    ):
+        """Defers the interaction, renders the panel and sends it as a followup
+        Shared by /grafana panel and the /grafana listpanels select menu
+        """
         await interaction.response.defer()  # Defer the response
-        print("Interaction response deferred")  # Debug print
+        self.logger.debug("Interaction response deferred")
         try:
-            print(f"Fetching panel: {panel_name}")  # Debug print
-            panel_data = await self.fetch_rendered_panel(panel_name)
+            self.logger.debug(f"Fetching panel: {panel_name}")
+            panel_data = await self.fetch_rendered_panel(panel_name, width, height, options)
             if panel_data:
-                print(f"Panel data fetched for {panel_name}")  # Debug print
                 await interaction.followup.send(file=panel_data)
                 self.logger.info(f"Panel {panel_name} sent to {interaction.user.name}")
             else:
-                print("Failed to fetch panel data")  # Debug print
+                self.logger.warning(f"Failed to fetch panel {panel_name}")
                 await interaction.followup.send("Failed to fetch the panel.")
+        except BackendUnavailable as e:
+            await interaction.followup.send(f"⛔ {e}")
         except Exception as e:
             self.logger.error(f"Error fetching panel: {e}")
-            print(f"Exception occurred: {e}")  # Debug print
             await interaction.followup.send(
                 "An error occurred while fetching the panel."
             )
@@ -345,33 +663,219 @@ class Grafana_Discord_Integration_Cog(commands.Cog):
             )
             # TODO: Implement logic to fetch and send the panel image with the selected time range
 
-    #! Needs work
-    # todo: improve the display of the panels, maybe use a select menu
     @grafana.command(
         name="listpanels", description="List all panels available to display"
     )
     async def grafana_listpanels(self, Interaction: discord.Interaction):
-        """List all panels available to display
+        """List all panels available to display, a page at a time with a select menu to display one
         Usage: /grafana listpanels
         """
-        panel_options = list(self.panels.keys())
-        midpoint = len(panel_options) // 2
-        embed = discord.Embed(
-            title="Grafana - Available Panels", color=discord.Color.blue()
+        view = PanelListView(self, self.panel_pages)
+        await Interaction.response.send_message(embed=self.panel_pages[0].embed, view=view)
+        self.logger.info(f"Panel list sent to {Interaction.user.name}")
+
+    # section Scheduled reports, rendered through the same fetch path as the commands above
+
+    async def render_report(self, report: GrafanaReport):
+        """Renders every dashboard or panel in a report
+        :param report: The report to render
+        :return: A list of (target, discord.File) tuples for the targets that rendered successfully
+        """
+        rendered = []
+        options = RenderOptions(time_from=report.time_from, time_to=report.time_to)
+        for target in report.targets:
+            if report.target_type == "dashboard":
+                file = await self.fetch_rendered_dashboard(
+                    target, report.width, report.height, options
+                )
+            else:
+                file = await self.fetch_rendered_panel(
+                    target, report.width, report.height, options
+                )
+            if file:
+                rendered.append((target, file))
+            else:
+                self.logger.error(f"Report {report.name}: failed to render {target}")
+        return rendered
+
+    @staticmethod
+    def _read_image(stream) -> bytes:
+        # the stream may be a spooled temp file, read it without moving it for the upload
+        position = stream.tell()
+        try:
+            return stream.read()
+        finally:
+            stream.seek(position)
+
+    async def post_report(self, report: GrafanaReport, force: bool = False) -> str:
+        """Renders a report and posts it, skipping or editing in place when nothing has visibly changed
+        :param report: The report to post
+        :param force: Post a new message even if the images are unchanged
+        :return: A short description of what happened
+        """
+        now = datetime.now(timezone.utc)
+        channel = self.bot.get_channel(report.channel_id)
+        if channel is None:
+            channel = await self.bot.fetch_channel(report.channel_id)
+        rendered = await self.render_report(report)
+        report.last_run = now.isoformat()
+        if not rendered:
+            await self.reports.save(report)
+            return "nothing rendered"
+
+        # decoding and hashing the images is CPU work, it runs on the job queue instead of the event loop
+        images = [self._read_image(file.fp) for _, file in rendered]
+        values = await asyncio.gather(*(self.bot.jobs.run(perceptual_hash_bytes, image) for image in images))
+        hashes = {target: value for (target, _), value in zip(rendered, values)}
+        filenames = [file.filename for _, file in rendered]
+        # discord.py closes the files after every send or edit attempt, keep the bytes and build new ones per attempt
+        for _, file in rendered:
+            file.close()
+
+        def build_files() -> list:
+            return [discord.File(BytesIO(image), filename=filename) for image, filename in zip(images, filenames)]
+
+        content = f"**{report.name}** ({report.time_from} to {report.time_to}) - <t:{int(now.timestamp())}:f>"
+        unchanged = not force and report.is_unchanged(hashes)
+        outcome = "posted"
+        if unchanged and report.on_unchanged == "skip":
+            outcome = "skipped, unchanged"
+        elif unchanged and report.last_message_id:
+            try:
+                await channel.get_partial_message(report.last_message_id).edit(
+                    content=content, attachments=build_files()
+                )
+                outcome = "edited in place, unchanged"
+            except discord.NotFound:
+                report.last_message_id = None
+        if outcome == "posted":
+            message = await channel.send(content=content, files=build_files())
+            report.last_message_id = message.id
+        report.last_hashes = {target: f"{value:016x}" for target, value in hashes.items()}
+        await self.reports.save(report)
+        self.logger.info(f"Report {report.name}: {outcome}")
+        return outcome
+
+    @tasks.loop(minutes=1)
+    async def run_due_reports(self):
+        # reports may have been added or removed by another process of a sharded bot
+        await self.reports.refresh()
+        for report in self.reports.due(datetime.now(timezone.utc)):
+            try:
+                await self.post_report(report)
+            except Exception as e:
+                self.logger.error(f"Error posting report {report.name}: {e}")
+
+    @run_due_reports.before_loop
+    async def before_run_due_reports(self):
+        await self.bot.wait_until_ready()
+
+    # discord - report command group, the definitions are stored on disk so schedules survive restarts.
+    grafanareport = app_commands.Group(
+        name="grafanareport",
+        description="Schedule Grafana dashboards or panels to be posted to a channel.",
+    )
+
+    @grafanareport.command(name="add", description="Schedule a Grafana report")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def report_add(
+        self,
+        Interaction: discord.Interaction,
+        name: str,
+        target_type: Literal["dashboard", "panel"],
+        targets: str,
+        channel: discord.TextChannel,
+        schedule: str,
+        width: int = 1800,
+        height: int = 1200,
+        time_from: str = "now-1h",
+        time_to: str = "now",
+        on_unchanged: Literal["skip", "edit"] = "skip",
+    ):
+        """Schedule a Grafana report
+        Usage: /grafanareport add [name] [target_type] [targets] [channel] [schedule] [width] [height] [time_from] [time_to] [on_unchanged]
+        targets is a comma separated list, schedule is an interval such as 6h or a cron expression such as 0 */6 * * *
+        """
+        try:
+            report = GrafanaReport(
+                name=name,
+                target_type=target_type,
+                targets=[target.strip() for target in targets.split(",") if target.strip()],
+                channel_id=channel.id,
+                schedule=schedule,
+                width=width,
+                height=height,
+                time_from=time_from,
+                time_to=time_to,
+                on_unchanged=on_unchanged,
+            )
+        except ValueError as e:
+            await Interaction.response.send_message(f"Invalid report: {e}", ephemeral=True)
+            return
+        if target_type == "panel":
+            unknown = [target for target in report.targets if target not in self.panels]
+            if unknown:
+                await Interaction.response.send_message(
+                    f"Unknown panels: {', '.join(unknown)}", ephemeral=True
+                )
+                return
+        await self.reports.add(report)
+        await Interaction.response.send_message(
+            f"Report `{name}` scheduled in {channel.mention}, next run <t:{int(report.next_run().timestamp())}:R>"
         )
-        # Splitting the panel options into two columns for the embed
-        column1 = panel_options[:midpoint]
-        column2 = panel_options[midpoint:]  # Fix: Define column2
-        # Add the panel names to an embed
-        for entry1, entry2 in zip(column1, column2):
-            embed.add_field(
-                name=entry1, value=entry2, inline=True
-            )  # Fix: Set value to entry2
-            embed.add_field(name=entry2, value="\u200b", inline=True)
-            embed.add_field(name="\u200b", value="\u200b", inline=True)  # Spacer
+        self.logger.info(f"Report {name} scheduled by {Interaction.user.name}")
+
+    @grafanareport.command(name="remove", description="Remove a scheduled Grafana report")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def report_remove(self, Interaction: discord.Interaction, name: str):
+        """Remove a scheduled Grafana report
+        Usage: /grafanareport remove [name]
+        """
+        if await self.reports.remove(name):
+            await Interaction.response.send_message(f"Report `{name}` removed.")
+            self.logger.info(f"Report {name} removed by {Interaction.user.name}")
+        else:
+            await Interaction.response.send_message(f"No report named `{name}`.", ephemeral=True)
 
+    @grafanareport.command(name="list", description="List the scheduled Grafana reports")
+    async def report_list(self, Interaction: discord.Interaction):
+        """List the scheduled Grafana reports
+        Usage: /grafanareport list
+        """
+        await self.reports.refresh()
+        embed = discord.Embed(title="Grafana - Scheduled Reports", color=discord.Color.blue())
+        for report in list(self.reports.reports.values())[:25]:
+            embed.add_field(
+                name=report.name,
+                value=(
+                    f"{report.target_type}: {', '.join(report.targets)}\n"
+                    f"<#{report.channel_id}> `{report.schedule}` ({report.on_unchanged} when unchanged)\n"
+                    f"Next run <t:{int(report.next_run().timestamp())}:R>"
+                ),
+                inline=False,
+            )
+        if not self.reports.reports:
+            embed.description = "No reports scheduled."
         await Interaction.response.send_message(embed=embed)
-        self.logger.info(f"Panel list sent to {Interaction.user.name}")
+
+    @grafanareport.command(name="run", description="Post a scheduled Grafana report now")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def report_run(self, Interaction: discord.Interaction, name: str):
+        """Post a scheduled Grafana report now
+        Usage: /grafanareport run [name]
+        """
+        await self.reports.refresh()
+        report = self.reports.reports.get(name)
+        if report is None:
+            await Interaction.response.send_message(f"No report named `{name}`.", ephemeral=True)
+            return
+        await Interaction.response.defer()
+        try:
+            outcome = await self.post_report(report, force=True)
+            await Interaction.followup.send(f"Report `{name}`: {outcome}")
+        except Exception as e:
+            self.logger.error(f"Error posting report {name}: {e}")
+            await Interaction.followup.send("An error occurred while posting the report.")
 
 
 async def setup(bot):
@@ -0,0 +1,170 @@
+# Render options, normalized render urls and the render cache for the Grafana integration.
+#
+# Every render request is reduced to one normalized url (sorted query parameters, encoded template variables).
+# That url is the render cache key, so equivalent requests built in a different order share cached images.
+
+import asyncio
+import base64
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+RENDER_THEMES = ("light", "dark")
+
+
+def parse_variables(text: str) -> dict:
+    """Parses template variables written as name=value pairs separated by commas
+    Repeating a name selects multiple values, e.g. 'host=a,host=b,env=prod'
+    :param text: The variables as typed by the user
+    :return: A dictionary of variable name to a list of values
+    """
+    variables = {}
+    if not text:
+        return variables
+    for pair in text.split(","):
+        if not pair.strip():
+            continue
+        if "=" not in pair:
+            raise ValueError(f"Template variables must be written as name=value, got: {pair.strip()}")
+        name, value = pair.split("=", 1)
+        variables.setdefault(name.strip(), []).append(value.strip())
+    return variables
+
+
+class RenderOptions:
+    """Time range, timezone, organisation, theme and template variables of a render request"""
+
+    def __init__(
+        self,
+        time_from: str = "now-1h",
+        time_to: str = "now",
+        timezone: str = None,
+        org_id: int = 1,
+        theme: str = None,
+        variables: dict = None,
+    ):
+        if theme is not None and theme not in RENDER_THEMES:
+            raise ValueError(f"Theme must be one of {', '.join(RENDER_THEMES)}")
+        self.time_from = time_from
+        self.time_to = time_to
+        self.timezone = timezone
+        self.org_id = org_id
+        self.theme = theme
+        self.variables = {name: list(values) for name, values in (variables or {}).items()}
+
+    def with_default_variables(self, defaults: dict):
+        """Returns a copy of these options with defaults filled in for any variable not given"""
+        variables = {name: list(values) for name, values in defaults.items()}
+        variables.update(self.variables)
+        return RenderOptions(
+            self.time_from, self.time_to, self.timezone, self.org_id, self.theme, variables
+        )
+
+    def query_params(self) -> list:
+        params = [("orgId", str(self.org_id)), ("from", self.time_from), ("to", self.time_to)]
+        if self.timezone:
+            params.append(("tz", self.timezone))
+        if self.theme:
+            params.append(("theme", self.theme))
+        for name, values in self.variables.items():
+            params.extend((f"var-{name}", value) for value in values)
+        return params
+
+
+def build_render_url(grafana_url: str, path: str, params: dict, options: RenderOptions) -> str:
+    """Builds the normalized render url used both for the request and as the render cache key
+    :param grafana_url: The Grafana host
+    :param path: The render path, e.g. render/d-solo/<uid>/<slug>
+    :param params: Render specific query parameters such as panelId, width and height
+    :param options: The time range, org, theme and template variables of the request
+    :return: The render url with its query parameters in a stable order
+    """
+    query = [(key, str(value)) for key, value in params.items() if value is not None]
+    query.extend(options.query_params())
+    # sorting is stable, so repeated values of a multi-value variable keep the order they were given in
+    query.sort(key=lambda item: item[0])
+    return f"https://{grafana_url}/{path}?{urlencode(query)}"
+
+
+class RenderCache:
+    """A small LRU cache of rendered images keyed by normalized render url, with a short time to live
+
+    Relative time ranges such as now-1h move with the clock, so entries only live for a short time.
+    Concurrent requests for the same url are serialized on a per-url lock so only one of them hits
+    the render engine and the rest are answered from the cache. The cache is bounded by the total size of
+    its images as well as by entry count.
+    """
+
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 64, max_bytes: int = 32 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._locks = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _pop(self, url: str):
+        entry = self._entries.pop(url, None)
+        if entry is not None:
+            self.nbytes -= len(entry[1])
+
+    def _store(self, url: str, expires: float, content: bytes):
+        if len(content) > self.max_bytes:
+            return
+        self._pop(url)
+        self._entries[url] = (expires, content)
+        self.nbytes += len(content)
+        while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+            self._pop(next(iter(self._entries)))
+
+    def get(self, url: str):
+        entry = self._entries.get(url)
+        if entry is None or entry[0] < time.monotonic():
+            self._pop(url)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(url)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, url: str, content: bytes):
+        """Caches an image, every hit is served from this one bytes object without copying it"""
+        if self.ttl_seconds <= 0:
+            return
+        self._store(url, time.monotonic() + self.ttl_seconds, content)
+
+    def dump(self) -> list:
+        """The unexpired entries as [url, seconds left, base64 image], oldest first, for the snapshot store"""
+        now = time.monotonic()
+        return [
+            [url, expires - now, base64.b64encode(content).decode("ascii")]
+            for url, (expires, content) in self._entries.items()
+            if expires > now
+        ]
+
+    def restore(self, entries: list, saved_at: float):
+        """Puts dumped entries back, minus the time that passed since they were saved"""
+        elapsed = time.time() - saved_at
+        for url, seconds_left, content in entries:
+            if seconds_left - elapsed > 0:
+                self._store(url, time.monotonic() + seconds_left - elapsed, base64.b64decode(content))
+
+    def lock(self, url: str) -> asyncio.Lock:
+        """The lock of a url, every call must be paired with a release(url)"""
+        entry = self._locks.get(url)
+        if entry is None:
+            entry = self._locks[url] = [asyncio.Lock(), 0]
+        # counted rather than checked with locked(), which is False while queued waiters are being woken
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, url: str):
+        """Drops the lock of a url once nobody holds or waits on it, so the lock table stays small"""
+        entry = self._locks.get(url)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._locks[url]
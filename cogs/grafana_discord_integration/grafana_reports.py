@@ -0,0 +1,351 @@
+# Scheduled Grafana report definitions, schedule parsing, persistence and perceptual hashing.
+#
+# A report is a (dashboard or panel set, channel, schedule, size, time range) definition that the
+# Grafana_Discord_Integration_Cog renders through its normal fetch path and posts on schedule.
+# Reports and their last posted state are stored as json so they survive bot restarts.
+
+import asyncio
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+
+from core.file_lock import file_lock
+
+
+# Reports must not fire more often than this, the render engine is expensive
+MIN_REPORT_INTERVAL = timedelta(minutes=5)
+
+# Two images whose dHash differs by this many bits or fewer are treated as unchanged
+DEFAULT_HASH_THRESHOLD = 4
+
+REPORT_TARGET_TYPES = ("panel", "dashboard")
+REPORT_UNCHANGED_MODES = ("skip", "edit")
+
+
+# section Schedule parsing
+
+
+class IntervalSchedule:
+    """A fixed interval schedule, written as e.g. '6h', '90m', '1d' or 'every 1h30m'"""
+
+    _part = re.compile(r"(\d+)\s*([smhd])")
+    _units = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+    def __init__(self, expression: str):
+        text = expression.strip().lower()
+        if text.startswith("every "):
+            text = text[len("every ") :]
+        parts = self._part.findall(text)
+        if not parts or self._part.sub("", text).strip():
+            raise ValueError(f"Invalid interval: {expression}")
+        self.interval = timedelta()
+        for amount, unit in parts:
+            self.interval += timedelta(**{self._units[unit]: int(amount)})
+        if self.interval < MIN_REPORT_INTERVAL:
+            raise ValueError(
+                f"Report interval must be at least {int(MIN_REPORT_INTERVAL.total_seconds() // 60)} minutes"
+            )
+
+    def next_run(self, after: datetime) -> datetime:
+        return after + self.interval
+
+
+class CronSchedule:
+    """A standard five field cron schedule (minute hour day-of-month month day-of-week), evaluated in UTC"""
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Invalid cron expression: {expression}")
+        self.minutes = self._parse_field(fields[0], 0, 59)
+        self.hours = self._parse_field(fields[1], 0, 23)
+        self.days = self._parse_field(fields[2], 1, 31)
+        self.months = self._parse_field(fields[3], 1, 12)
+        # cron allows both 0 and 7 for sunday
+        self.weekdays = {day % 7 for day in self._parse_field(fields[4], 0, 7)}
+        self.days_restricted = fields[2] != "*"
+        self.weekdays_restricted = fields[4] != "*"
+        if len(self.minutes) > 12 or (len(self.minutes) > 1 and self._min_gap() < 5):
+            raise ValueError("Report schedules must not fire more than once every 5 minutes")
+        # an impossible date such as "0 0 30 2 *" parses fine, find that out now rather than after the first run
+        self.next_run(datetime.now(timezone.utc))
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> set:
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_text = part.split("/", 1)
+                step = int(step_text)
+                if step < 1:
+                    raise ValueError(f"Invalid cron step: {field}")
+            if part in ("*", ""):
+                start, end = low, high
+            elif "-" in part:
+                start, end = (int(value) for value in part.split("-", 1))
+            else:
+                start = int(part)
+                end = high if step != 1 else start
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field out of range: {field}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _min_gap(self) -> int:
+        minutes = sorted(self.minutes)
+        gaps = [b - a for a, b in zip(minutes, minutes[1:])]
+        gaps.append(60 - minutes[-1] + minutes[0])
+        return min(gaps)
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_match = moment.day in self.days
+        # python weekday() is monday=0, cron is sunday=0
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return day_match or weekday_match
+        if self.days_restricted:
+            return day_match
+        if self.weekdays_restricted:
+            return weekday_match
+        return True
+
+    def next_run(self, after: datetime) -> datetime:
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # bounded search, jumping whole months/days/hours when they can't match
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                year = moment.year + (moment.month == 12)
+                month = moment.month % 12 + 1
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+                continue
+            if moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+                continue
+            return moment
+        raise ValueError("Cron expression never fires")
+
+
+def parse_schedule(expression: str):
+    """Parses a report schedule, either a five field cron expression or an interval such as '6h'
+    :param expression: The schedule expression
+    :return: An IntervalSchedule or CronSchedule
+    """
+    if len(expression.split()) == 5:
+        return CronSchedule(expression)
+    return IntervalSchedule(expression)
+
+
+# section Perceptual hashing
+
+
+def perceptual_hash(image_stream, hash_size: int = 8) -> int:
+    """Computes a difference hash (dHash) of an image, similar images produce hashes with a small hamming distance
+    :param image_stream: A readable, seekable binary stream containing the image
+    :param hash_size: The hash is hash_size * hash_size bits
+    :return: The hash as an int
+    """
+    # Pillow is only needed once a report runs, not when the cog is imported
+    from PIL import Image
+
+    position = image_stream.tell()
+    try:
+        with Image.open(image_stream) as image:
+            pixels = list(
+                image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS).getdata()
+            )
+    finally:
+        image_stream.seek(position)
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for column in range(hash_size):
+            value = (value << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return value
+
+
+def perceptual_hash_bytes(data: bytes, hash_size: int = 8) -> int:
+    """perceptual_hash of an image held in memory, the form bot.jobs can send to a worker process"""
+    return perceptual_hash(BytesIO(data), hash_size)
+
+
+def hamming_distance(first: int, second: int) -> int:
+    return bin(first ^ second).count("1")
+
+
+# section Report definitions and persistence
+
+
+class GrafanaReport:
+    """A scheduled report definition and the state of its last posting"""
+
+    def __init__(
+        self,
+        name: str,
+        target_type: str,
+        targets: list,
+        channel_id: int,
+        schedule: str,
+        width: int = 1800,
+        height: int = 1200,
+        time_from: str = "now-1h",
+        time_to: str = "now",
+        on_unchanged: str = "skip",
+        last_run: str = None,
+        last_hashes: dict = None,
+        last_message_id: int = None,
+    ):
+        if target_type not in REPORT_TARGET_TYPES:
+            raise ValueError(f"Report target type must be one of {', '.join(REPORT_TARGET_TYPES)}")
+        if on_unchanged not in REPORT_UNCHANGED_MODES:
+            raise ValueError(f"on_unchanged must be one of {', '.join(REPORT_UNCHANGED_MODES)}")
+        if not targets:
+            raise ValueError("A report needs at least one dashboard or panel")
+        self.name = name
+        self.target_type = target_type
+        self.targets = list(targets)
+        self.channel_id = int(channel_id)
+        self.schedule = schedule
+        self.width = width
+        self.height = height
+        self.time_from = time_from
+        self.time_to = time_to
+        self.on_unchanged = on_unchanged
+        self.last_run = last_run
+        self.last_hashes = dict(last_hashes or {})
+        self.last_message_id = last_message_id
+        # validate the schedule up front so a bad definition is never stored
+        self._schedule = parse_schedule(schedule)
+
+    def next_run(self) -> datetime:
+        if self.last_run is None:
+            return datetime.now(timezone.utc)
+        return self._schedule.next_run(datetime.fromisoformat(self.last_run))
+
+    def is_due(self, now: datetime) -> bool:
+        return self.next_run() <= now
+
+    def is_unchanged(self, hashes: dict, threshold: int = DEFAULT_HASH_THRESHOLD) -> bool:
+        """True when every rendered image is perceptually the same as the previous posting"""
+        if set(hashes) != set(self.last_hashes):
+            return False
+        return all(
+            hamming_distance(hashes[target], int(self.last_hashes[target], 16)) <= threshold
+            for target in hashes
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "target_type": self.target_type,
+            "targets": self.targets,
+            "channel_id": self.channel_id,
+            "schedule": self.schedule,
+            "width": self.width,
+            "height": self.height,
+            "time_from": self.time_from,
+            "time_to": self.time_to,
+            "on_unchanged": self.on_unchanged,
+            "last_run": self.last_run,
+            "last_hashes": self.last_hashes,
+            "last_message_id": self.last_message_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**data)
+
+
+class ReportStore:
+    """Keeps the report definitions in memory and persists them to a json file on every change
+    Every change is applied to the file as currently stored, under a lock, so the processes of a sharded bot
+    can share it. The file is read and written on a worker thread, waiting on another process's lock never
+    blocks the event loop.
+    """
+
+    def __init__(self, path: str, logger):
+        self.path = path
+        self.logger = logger
+        self.reports = {}
+        # one refresh or change at a time, so an older read never replaces a newer one
+        self._lock = asyncio.Lock()
+
+    def _read(self) -> dict:
+        reports = {}
+        if not os.path.exists(self.path):
+            return reports
+        with open(self.path, "r", encoding="utf-8") as file:
+            stored = json.load(file)
+        for data in stored.get("reports", []):
+            try:
+                report = GrafanaReport.from_dict(data)
+                reports[report.name] = report
+            except (TypeError, ValueError) as e:
+                self.logger.error(f"Skipping invalid Grafana report {data.get('name')}: {e}")
+        return reports
+
+    def load(self):
+        self.reports = self._read()
+        self.logger.info(f"Loaded {len(self.reports)} Grafana reports from {self.path}")
+
+    async def refresh(self):
+        """Reads the file again, picking up reports other processes added, removed or ran"""
+        async with self._lock:
+            self.reports = await asyncio.to_thread(self._read)
+
+    def _write(self, reports: dict):
+        # write to a temporary file first so a crash mid-write never corrupts the stored schedules
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"reports": [report.to_dict() for report in reports.values()]}, file, indent=2)
+        os.replace(temp_path, self.path)
+
+    def _apply(self, change) -> tuple:
+        with file_lock(self.path):
+            reports = self._read()
+            result = change(reports)
+            self._write(reports)
+        return reports, result
+
+    async def _update(self, change):
+        """Applies change(reports) on top of the stored reports and writes them back, under the file lock
+        :return: What change returns
+        """
+        async with self._lock:
+            self.reports, result = await asyncio.to_thread(self._apply, change)
+        return result
+
+    async def save(self, report: GrafanaReport):
+        """Saves the state of a report after it ran, unless it was removed in the meantime"""
+
+        def change(reports: dict):
+            if report.name in reports:
+                reports[report.name] = report
+
+        await self._update(change)
+
+    async def add(self, report: GrafanaReport):
+        await self._update(lambda reports: reports.__setitem__(report.name, report))
+
+    async def remove(self, name: str) -> bool:
+        return await self._update(lambda reports: reports.pop(name, None) is not None)
+
+    def due(self, now: datetime) -> list:
+        due = []
+        for report in self.reports.values():
+            try:
+                if report.is_due(now):
+                    due.append(report)
+            except ValueError as e:
+                # one broken schedule must not stop the others
+                self.logger.error(f"Cannot schedule Grafana report {report.name}: {e}")
+        return due
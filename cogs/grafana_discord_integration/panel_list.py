@@ -0,0 +1,84 @@
+# Paginated listing of the Grafana panel catalog for /grafana listpanels.
+#
+# The pages (embeds and select menu options) are built once whenever the panel catalog is loaded, so the
+# command only has to attach a view to the first page.
+
+import discord
+
+# A select menu holds at most 25 options, one page maps to one select menu
+PANELS_PER_PAGE = 25
+
+
+class PanelListPage:
+    """One prebuilt page of the panel listing"""
+
+    def __init__(self, embed: discord.Embed, panel_names: list, options: list):
+        self.embed = embed
+        self.panel_names = panel_names
+        self.options = options
+
+
+def build_panel_pages(panel_names: list, per_page: int = PANELS_PER_PAGE) -> list:
+    """Splits the panel catalog into pages of embeds and select options
+    :param panel_names: The names of every panel in the catalog
+    :param per_page: The number of panels on each page
+    :return: A list of PanelListPage, always at least one page
+    """
+    chunks = [panel_names[i : i + per_page] for i in range(0, len(panel_names), per_page)] or [[]]
+    pages = []
+    for number, chunk in enumerate(chunks, start=1):
+        first = (number - 1) * per_page + 1
+        embed = discord.Embed(
+            title="Grafana - Available Panels",
+            description="\n".join(
+                f"`{first + index}` {name}" for index, name in enumerate(chunk)
+            )
+            or "No panels are configured.",
+            color=discord.Color.blue(),
+        )
+        embed.set_footer(
+            text=f"Page {number}/{len(chunks)} - {len(panel_names)} panels - pick one below to display it"
+        )
+        options = [
+            # select values are limited to 100 characters, so the option carries the index on the page
+            discord.SelectOption(label=name[:100], value=str(index))
+            for index, name in enumerate(chunk)
+        ]
+        pages.append(PanelListPage(embed, chunk, options))
+    return pages
+
+
+class PanelListView(discord.ui.View):
+    """Previous/next buttons over the prebuilt pages and a select menu that displays the chosen panel"""
+
+    def __init__(self, cog, pages: list, timeout: float = 300):
+        super().__init__(timeout=timeout)
+        self.cog = cog
+        self.pages = pages
+        self.page = 0
+        self._refresh_components()
+
+    def _refresh_components(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= len(self.pages) - 1
+        options = self.pages[self.page].options
+        self.panel_select.options = options or [discord.SelectOption(label="No panels", value="-1")]
+        self.panel_select.disabled = not options
+
+    async def _show_page(self, interaction: discord.Interaction, page: int):
+        self.page = page
+        self._refresh_components()
+        await interaction.response.edit_message(embed=self.pages[self.page].embed, view=self)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show_page(interaction, max(self.page - 1, 0))
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show_page(interaction, min(self.page + 1, len(self.pages) - 1))
+
+    @discord.ui.select(placeholder="Display a panel...")
+    async def panel_select(self, interaction: discord.Interaction, select: discord.ui.Select):
+        panel_name = self.pages[self.page].panel_names[int(select.values[0])]
+        await self.cog.send_panel(interaction, panel_name)
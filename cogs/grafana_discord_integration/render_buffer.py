@@ -0,0 +1,55 @@
+# Streaming download of Grafana render responses into a size-thresholded spooled buffer.
+#
+# Small images stay in a BytesIO, anything over the spool threshold spills into an anonymous temporary
+# file. Either way the returned object is a seekable io.IOBase that discord.File accepts directly, so the
+# image is never held in memory twice.
+
+import tempfile
+from io import BytesIO
+
+RENDER_CHUNK_SIZE = 64 * 1024
+
+
+class RenderTooLarge(Exception):
+    """Raised when a render response exceeds the configured maximum size"""
+
+    def __init__(self, size: int, max_bytes: int):
+        super().__init__(f"Rendered image is {size} bytes, larger than the {max_bytes} byte limit")
+        self.size = size
+        self.max_bytes = max_bytes
+
+
+async def spool_response(response, spool_bytes: int, max_bytes: int, chunk_size: int = RENDER_CHUNK_SIZE):
+    """Streams an aiohttp response body into memory, spilling to a temporary file above spool_bytes
+    :param response: The aiohttp ClientResponse to read
+    :param spool_bytes: The size above which the body is moved from memory to a temporary file
+    :param max_bytes: The size above which the download is abandoned
+    :param chunk_size: The size of each chunk read from the response
+    :return: A binary file object positioned at the start of the body
+    """
+    declared = response.content_length
+    if declared is not None and declared > max_bytes:
+        raise RenderTooLarge(declared, max_bytes)
+
+    # when the size is known up front go straight to disk rather than spilling halfway through
+    spilled = declared is not None and declared > spool_bytes
+    buffer = tempfile.TemporaryFile() if spilled else BytesIO()
+    size = 0
+    try:
+        async for chunk in response.content.iter_chunked(chunk_size):
+            size += len(chunk)
+            if size > max_bytes:
+                raise RenderTooLarge(size, max_bytes)
+            if not spilled and size > spool_bytes:
+                disk_buffer = tempfile.TemporaryFile()
+                with buffer.getbuffer() as view:
+                    disk_buffer.write(view)
+                buffer.close()
+                buffer = disk_buffer
+                spilled = True
+            buffer.write(chunk)
+    except BaseException:
+        buffer.close()
+        raise
+    buffer.seek(0)
+    return buffer
@@ -3,12 +3,8 @@ from discord.ext import commands, tasks
 from itertools import cycle
 import random
 
-intents = discord.Intents.default()
-intents.message_content = True
-intents.messages = True
-intents.guilds = True
-intents.reactions = True
-intents.members = True
+# only changes the bot's presence, which needs no intents
+REQUIRED_INTENTS = discord.Intents.none()
 
 class QuantumlyConfusedStatusCog(commands.Cog):
     def __init__(self, bot):
@@ -35,7 +31,7 @@ class QuantumlyConfusedStatusCog(commands.Cog):
         ]
         self.status_cycle = cycle(self.status_messages)
         self.change_status.start()
-        self.logger = bot.logger
+        self.logger = bot.logger.getChild("qc_status")
         self.logger.info("Initalizing QuantumlyConfusedStatusCog")
     
     @tasks.loop(minutes=20)  # Change status every 20 minutes
@@ -0,0 +1,86 @@
+# Bulk power operations across many Pterodactyl servers.
+#
+# Signals fan out concurrently, capped by a semaphore. In rolling mode each slot is held until the server
+# reaches its target state, so "restart 3 at a time, wait until running" is concurrency=3 with rolling=True.
+
+import asyncio
+import time
+
+from .pterodactyl_client import PterodactylAPIError
+
+# The state a server should settle in after each power signal
+SIGNAL_TARGET_STATES = {
+    "start": "running",
+    "restart": "running",
+    "stop": "offline",
+    "kill": "offline",
+}
+
+
+class PowerResult:
+    def __init__(self, server, success: bool, message: str, elapsed: float):
+        self.server = server
+        self.success = success
+        self.message = message
+        self.elapsed = elapsed
+
+
+async def run_bulk_power(
+    client,
+    logger,
+    signal: str,
+    servers: list,
+    concurrency: int = 5,
+    rolling: bool = False,
+    timeout: float = 300,
+    tracker=None,
+    on_result=None,
+) -> list:
+    """Sends a power signal to many servers at once
+    :param client: The PterodactylClient
+    :param logger: The cog logger
+    :param signal: One of 'start', 'stop', 'restart', 'kill'
+    :param servers: The GameServer objects to target
+    :param concurrency: The maximum number of servers being handled at once
+    :param rolling: Hold each slot until the server reaches its target state before starting the next
+    :param timeout: How long a rolling slot waits for the target state
+    :param tracker: The PowerTracker used to wait for the target state, required when rolling
+    :param on_result: Optional coroutine function awaited with each PowerResult as soon as its server is done
+    :return: A PowerResult for every server, in the order given
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    target_state = SIGNAL_TARGET_STATES[signal]
+
+    async def handle(server) -> PowerResult:
+        result = await power(server)
+        if on_result is not None:
+            await on_result(result)
+        return result
+
+    async def power(server) -> PowerResult:
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                await client.send_power_signal(server.identifier, signal)
+                if rolling:
+                    transition = await tracker.track(
+                        server.identifier, target_state, timeout, leave_first=signal == "restart"
+                    )
+                    if not transition.reached:
+                        return PowerResult(
+                            server,
+                            False,
+                            f"not {target_state} after {int(timeout)}s, last seen {transition.state}",
+                            time.monotonic() - started,
+                        )
+                message = f"{target_state}" if rolling else f"{signal} signal sent"
+                return PowerResult(server, True, message, time.monotonic() - started)
+            except PterodactylAPIError as e:
+                return PowerResult(server, False, f"status {e.status}", time.monotonic() - started)
+            except Exception as e:
+                return PowerResult(server, False, str(e), time.monotonic() - started)
+
+    results = await asyncio.gather(*(handle(server) for server in servers))
+    failed = sum(not result.success for result in results)
+    logger.info(f"Bulk {signal}: {len(results) - failed} succeeded, {failed} failed")
+    return results
@@ -0,0 +1,218 @@
+# Idle auto-shutdown for Pterodactyl game servers.
+#
+# Each policy ties a Pterodactyl server to the RCON endpoint of the game running on it. The engine combines
+# the server's power state with the RCON player count and gracefully stops a running server once it has had
+# no players for the configured idle period. Policies are stored as json so they survive restarts.
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+from cogs.rcon_commands.rcon_client import RconClient, RconError
+from core.file_lock import file_lock
+from core.health import BackendError, BackendUnavailable
+
+# a policy can only name RCON_PASSWORD or RCON_PASSWORD_<something>, so it can't send e.g. the bot token as the
+# RCON login of a host it points at
+RCON_PASSWORD_ENV_PREFIX = "RCON_PASSWORD"
+
+
+def rcon_hosts_allowed(server) -> set:
+    """The hosts an idle policy may connect to for a server: its allocations and node, plus RCON_ALLOWED_HOSTS
+    :param server: The GameServer, or None when it is not in the inventory
+    """
+    hosts = {host.strip() for host in os.getenv("RCON_ALLOWED_HOSTS", "").split(",") if host.strip()}
+    return hosts | (server.addresses if server is not None else set())
+
+
+class IdlePolicy:
+    def __init__(
+        self,
+        server_id: str,
+        idle_minutes: int,
+        rcon_host: str,
+        rcon_port: int = 25575,
+        rcon_password_env: str = "RCON_PASSWORD",
+        enabled: bool = True,
+    ):
+        if idle_minutes < 1:
+            raise ValueError("idle_minutes must be at least 1")
+        if rcon_password_env != RCON_PASSWORD_ENV_PREFIX and not rcon_password_env.startswith(
+            f"{RCON_PASSWORD_ENV_PREFIX}_"
+        ):
+            raise ValueError(
+                f"rcon_password_env must be {RCON_PASSWORD_ENV_PREFIX} or start with {RCON_PASSWORD_ENV_PREFIX}_"
+            )
+        self.server_id = server_id
+        self.idle_minutes = idle_minutes
+        self.rcon_host = rcon_host
+        self.rcon_port = int(rcon_port)
+        # the password itself is never written to disk, only the name of the variable holding it
+        self.rcon_password_env = rcon_password_env
+        self.enabled = enabled
+
+    def to_dict(self) -> dict:
+        return {
+            "server_id": self.server_id,
+            "idle_minutes": self.idle_minutes,
+            "rcon_host": self.rcon_host,
+            "rcon_port": self.rcon_port,
+            "rcon_password_env": self.rcon_password_env,
+            "enabled": self.enabled,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**data)
+
+
+class IdlePolicyStore:
+    """Keeps the idle policies in memory and persists them to a json file on every change
+    Every change is applied to the file as currently stored, under a lock, so the processes of a sharded bot
+    can share it. The file is read and written on a worker thread, waiting on another process's lock never
+    blocks the event loop.
+    """
+
+    def __init__(self, path: str, logger):
+        self.path = path
+        self.logger = logger
+        self.policies = {}
+        # one refresh or change at a time, so an older read never replaces a newer one
+        self._lock = asyncio.Lock()
+
+    def _read(self) -> dict:
+        policies = {}
+        if not os.path.exists(self.path):
+            return policies
+        with open(self.path, "r", encoding="utf-8") as file:
+            stored = json.load(file)
+        for data in stored.get("policies", []):
+            try:
+                policy = IdlePolicy.from_dict(data)
+                policies[policy.server_id] = policy
+            except (TypeError, ValueError) as e:
+                self.logger.error(f"Skipping invalid idle policy {data.get('server_id')}: {e}")
+        return policies
+
+    def load(self):
+        self.policies = self._read()
+        self.logger.info(f"Loaded {len(self.policies)} idle policies from {self.path}")
+
+    async def refresh(self):
+        """Reads the file again, picking up policies other processes set or removed"""
+        async with self._lock:
+            self.policies = await asyncio.to_thread(self._read)
+
+    def _write(self, policies: dict):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"policies": [policy.to_dict() for policy in policies.values()]}, file, indent=2)
+        os.replace(temp_path, self.path)
+
+    def _apply(self, change) -> tuple:
+        with file_lock(self.path):
+            policies = self._read()
+            result = change(policies)
+            self._write(policies)
+        return policies, result
+
+    async def _update(self, change):
+        """Applies change(policies) on top of the stored policies and writes them back, under the file lock
+        :return: What change returns
+        """
+        async with self._lock:
+            self.policies, result = await asyncio.to_thread(self._apply, change)
+        return result
+
+    async def set(self, policy: IdlePolicy):
+        await self._update(lambda policies: policies.__setitem__(policy.server_id, policy))
+
+    async def remove(self, server_id: str) -> bool:
+        return await self._update(lambda policies: policies.pop(server_id, None) is not None)
+
+
+class IdlePolicyEngine:
+    def __init__(self, client, monitor, store: IdlePolicyStore, logger):
+        self.client = client
+        self.monitor = monitor
+        self.store = store
+        self.logger = logger
+        # server_id -> monotonic time the server was first seen running with no players
+        self.idle_since = {}
+        # server_id -> (player count, player names, unix time)
+        self.player_counts = {}
+        self.last_decision = {}
+        self.decisions = deque(maxlen=100)
+        self._rcon = {}
+
+    def _rcon_client(self, policy: IdlePolicy) -> RconClient:
+        client = self._rcon.get(policy.server_id)
+        password = os.getenv(policy.rcon_password_env, "")
+        if client is None or (client.host, client.port, client.password) != (
+            policy.rcon_host,
+            policy.rcon_port,
+            password,
+        ):
+            client = self._rcon[policy.server_id] = RconClient(policy.rcon_host, policy.rcon_port, password)
+        return client
+
+    async def close(self):
+        for client in self._rcon.values():
+            await client.close()
+        self._rcon.clear()
+
+    def grace(self, server_id: str):
+        """Restarts the idle clock, used when a server is woken on demand"""
+        self.idle_since[server_id] = time.monotonic()
+
+    def _decide(self, server_id: str, decision: str, level: str = "info") -> str:
+        # only changes of decision are logged, so a server sitting idle doesn't log on every tick
+        if self.last_decision.get(server_id) != decision:
+            getattr(self.logger, level)(f"Idle policy for server {server_id}: {decision}")
+            self.decisions.append((time.time(), server_id, decision))
+        self.last_decision[server_id] = decision
+        return decision
+
+    async def _power_state(self, server_id: str) -> str:
+        stats = self.monitor.snapshots.get(server_id)
+        if stats is not None and stats.version and stats.age < 60:
+            return stats.state
+        resources = await self.client.get_resources(server_id)
+        self.monitor.seed(server_id, resources)
+        return resources.get("current_state", "unknown")
+
+    async def evaluate(self, policy: IdlePolicy) -> str:
+        """Applies one policy: tracks how long the server has been empty and stops it once the idle period passes"""
+        server_id = policy.server_id
+        state = await self._power_state(server_id)
+        if state != "running":
+            self.idle_since.pop(server_id, None)
+            return self._decide(server_id, f"{state}, nothing to do")
+        try:
+            count, names = await self._rcon_client(policy).player_count()
+        except (RconError, BackendError, BackendUnavailable) as e:
+            # never stop a server whose player count is unknown
+            self.idle_since.pop(server_id, None)
+            return self._decide(server_id, f"player count unavailable ({e}), keeping it running", "warning")
+        self.player_counts[server_id] = (count, names, time.time())
+        if count > 0:
+            self.idle_since.pop(server_id, None)
+            return self._decide(server_id, f"{count} players online")
+        since = self.idle_since.setdefault(server_id, time.monotonic())
+        idle_minutes = (time.monotonic() - since) / 60
+        if idle_minutes < policy.idle_minutes:
+            return self._decide(server_id, f"empty, idle for less than {policy.idle_minutes} minutes")
+        await self.client.send_power_signal(server_id, "stop")
+        self.idle_since.pop(server_id, None)
+        return self._decide(server_id, f"stopped after {int(idle_minutes)} minutes without players")
+
+    async def tick(self):
+        for policy in list(self.store.policies.values()):
+            if not policy.enabled:
+                continue
+            try:
+                await self.evaluate(policy)
+            except Exception as e:
+                self.logger.error(f"Idle policy for server {policy.server_id} failed: {e}")
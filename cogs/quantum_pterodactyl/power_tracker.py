@@ -0,0 +1,99 @@
+# PowerTracker: follows a server through a power transition until it settles in the target state.
+#
+# While the server's websocket stream is live the tracker waits on the monitor's updates, otherwise it polls
+# /resources with an interval that starts short and backs off, so quick transitions are noticed quickly and
+# slow ones don't hammer the panel. Everyone waiting on the same server, target state and kind of transition
+# shares one tracker, a restart never joins a start that is already running.
+
+import asyncio
+import time
+
+import aiohttp
+
+from core.health import BackendError, BackendUnavailable
+
+from .pterodactyl_client import PterodactylAPIError
+
+
+class TransitionResult:
+    def __init__(self, server_id: str, target_state: str, reached: bool, state: str, elapsed: float):
+        self.server_id = server_id
+        self.target_state = target_state
+        self.reached = reached
+        # the last state seen, which is the target state when reached
+        self.state = state
+        self.elapsed = elapsed
+
+
+class PowerTracker:
+    def __init__(self, client, monitor, logger, min_interval: float = 1, max_interval: float = 10):
+        self.client = client
+        self.monitor = monitor
+        self.logger = logger
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        # (server_id, target_state, leave_first) -> running tracker task
+        self._trackers = {}
+
+    def active(self) -> list:
+        return list(self._trackers)
+
+    async def track(
+        self, server_id: str, target_state: str, timeout: float, leave_first: bool = False
+    ) -> TransitionResult:
+        """Waits until a server reaches target_state, joining a tracker that is already running for it
+        :param server_id: The server identifier
+        :param target_state: The state to wait for, e.g. 'running' or 'offline'
+        :param timeout: Seconds to wait before giving up
+        :param leave_first: Only accept the target state after the server was seen in another state, for restarts
+        :return: The TransitionResult
+        """
+        # a restart must see the server leave the target state first, a plain start must not wait for that
+        key = (server_id, target_state, leave_first)
+        task = self._trackers.get(key)
+        if task is None:
+            task = self._trackers[key] = asyncio.create_task(
+                self._follow(server_id, target_state, timeout, leave_first)
+            )
+            task.add_done_callback(lambda _: self._trackers.pop(key, None))
+        # shielded so one caller being cancelled doesn't cancel the tracker for everyone else
+        return await asyncio.shield(task)
+
+    async def _current_state(self, server_id: str) -> str:
+        resources = await self.client.get_resources(server_id)
+        self.monitor.seed(server_id, resources)
+        return resources.get("current_state", "unknown")
+
+    async def _follow(self, server_id: str, target_state: str, timeout: float, leave_first: bool) -> TransitionResult:
+        started = time.monotonic()
+        deadline = started + timeout
+        interval = self.min_interval
+        state = "unknown"
+        left = not leave_first
+        # open the stream so later iterations can wait on pushed updates instead of polling
+        self.monitor.watch(server_id)
+        while True:
+            stats = self.monitor.snapshot(server_id)
+            try:
+                if stats is not None and stats.live:
+                    state = stats.state
+                else:
+                    state = await self._current_state(server_id)
+            except (aiohttp.ClientError, PterodactylAPIError, BackendError, BackendUnavailable) as e:
+                # a failed poll only costs one interval, the panel often stutters while a server restarts
+                self.logger.warning(f"Power tracker for server {server_id} failed to poll: {e}")
+            if state != target_state and state != "unknown":
+                left = True
+            elif state == target_state and left:
+                elapsed = time.monotonic() - started
+                self.logger.info(f"Server {server_id} reached {target_state} after {elapsed:.1f}s")
+                return TransitionResult(server_id, target_state, True, state, elapsed)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.logger.warning(f"Server {server_id} not {target_state} after {int(timeout)}s, last seen {state}")
+                return TransitionResult(server_id, target_state, False, state, time.monotonic() - started)
+            if stats is not None and stats.live:
+                await self.monitor.wait_for_update(server_id, min(remaining, 30))
+            else:
+                await asyncio.sleep(min(interval, remaining))
+                interval = min(interval * 1.5, self.max_interval)
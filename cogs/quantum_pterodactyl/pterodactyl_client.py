@@ -0,0 +1,203 @@
+# PterodactylClient: a rate limit aware async client for the Pterodactyl client API.
+#
+# All QuantumPterodactyl requests go through one shared aiohttp session and one token bucket sized to the
+# panel's per-key request limit. 429 responses and failed connections are retried with jittered exponential
+# backoff, honouring the Retry-After header when the panel sends one, and 5xx responses only for idempotent
+# methods. A 429 or an exhausted key pauses the whole bucket until the rate limit window has passed. Every round
+# trip goes through the shared "pterodactyl" circuit breaker, so commands fail fast while the panel is down.
+
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+from core.health import CircuitBreaker
+
+# Status codes that are worth retrying, everything else is returned or raised straight away
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# A 5xx can come after the panel already acted on the request, e.g. a gateway 502 for an accepted restart, so
+# other methods (POST /power) are only retried on 429 or when the connection failed before anything was sent
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# The panel's rate limit window, how long an exhausted key waits when the panel doesn't say
+RATE_LIMIT_WINDOW = 60
+
+
+class PterodactylAPIError(Exception):
+    """Raised when the panel answers with an error status after any retries"""
+
+    def __init__(self, status: int, message: str, retry_after: float = None):
+        super().__init__(f"Pterodactyl API error {status}: {message}")
+        self.status = status
+        self.message = message
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """An async token bucket, refilled continuously at rate tokens per second up to capacity"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        # nothing refills while the bucket is paused by drain()
+        if now <= self.updated:
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        # the lock keeps waiters in order, so a burst of commands is released at the refill rate
+        async with self._lock:
+            pause = self.paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    def drain(self, seconds: float):
+        """Empties the bucket and holds every waiter for seconds, used when the panel reports that the key has
+        no requests left
+        """
+        self._refill()
+        self.tokens = min(self.tokens, 0)
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        # refilling resumes once the pause is over
+        self.updated = self.paused_until
+
+
+def retry_after_seconds(value: str):
+    """Parses a Retry-After header, either a number of seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+class PterodactylClient:
+    def __init__(
+        self,
+        panel_url: str,
+        api_key: str,
+        logger,
+        requests_per_minute: int = 720,
+        burst: int = 60,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30,
+        timeout: float = 15,
+        breaker: CircuitBreaker = None,
+    ):
+        self.panel_url = panel_url.rstrip("/")
+        self.logger = logger
+        self.bucket = TokenBucket(requests_per_minute / 60, min(burst, requests_per_minute))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.breaker = breaker or CircuitBreaker("pterodactyl", timeout=timeout)
+        # built once and shared by every request instead of per method
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # created lazily so the client can be built outside of a running event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(headers=self.headers, timeout=self.timeout)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def _backoff(self, attempt: int) -> float:
+        # full jitter, so many commands retrying at once don't hit the panel in lockstep
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2**attempt))
+
+    async def request(self, method: str, path: str, **kwargs):
+        """Sends a request to the client API, waiting for the rate limit and retrying 429 (and 5xx when idempotent)
+        :param method: The HTTP method
+        :param path: The path below the panel url, e.g. /api/client/servers/<id>/resources
+        :param kwargs: Passed on to aiohttp, e.g. json= or params=
+        :return: The decoded json body, or None for an empty response
+        """
+        url = f"{self.panel_url}{path}"
+        retry_statuses = RETRY_STATUSES if method.upper() in IDEMPOTENT_METHODS else {429}
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                status, retry_after, body = await self.breaker.call(self._exchange, method, url, **kwargs)
+            except PterodactylAPIError as e:
+                if e.status not in retry_statuses or attempt == self.max_retries:
+                    raise
+                status, retry_after = e.status, e.retry_after
+            except aiohttp.ClientConnectorError as e:
+                # the connection was never made, so the request was not sent and any method can be retried
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                self.logger.warning(
+                    f"Could not connect to the panel for {method} {path}, retrying in {delay:.1f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+                continue
+            if status in retry_statuses and attempt < self.max_retries:
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                self.logger.warning(
+                    f"Pterodactyl API returned {status} for {method} {path}, retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+                continue
+            if status >= 400:
+                raise PterodactylAPIError(status, body.decode("utf-8", errors="replace"))
+            if not body:
+                return None
+            return json.loads(body)
+
+    async def _exchange(self, method: str, url: str, **kwargs) -> tuple[int, float, bytes]:
+        """One round trip to the panel, server errors are raised so the circuit breaker counts them
+        Rate limiting (429) is not a failure of the panel and is returned like any other status.
+        """
+        async with self.session.request(method, url, **kwargs) as response:
+            retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+            if response.status == 429 or response.headers.get("X-RateLimit-Remaining") == "0":
+                self.bucket.drain(retry_after if retry_after is not None else RATE_LIMIT_WINDOW)
+            body = await response.read()
+            if response.status >= 500:
+                raise PterodactylAPIError(response.status, body.decode("utf-8", errors="replace"), retry_after)
+            return response.status, retry_after, body
+
+    async def send_power_signal(self, server_id: str, signal: str):
+        await self.request("POST", f"/api/client/servers/{server_id}/power", json={"signal": signal})
+
+    async def get_resources(self, server_id: str) -> dict:
+        data = await self.request("GET", f"/api/client/servers/{server_id}/resources")
+        return data.get("attributes", {})
+
+    async def list_servers(self, page: int = 1) -> dict:
+        return await self.request("GET", "/api/client", params={"page": page})
@@ -8,19 +8,30 @@
 
 import discord
 from discord import app_commands
-from discord.ext import commands
-import aiohttp
+from discord.ext import commands, tasks
 import os
-from dotenv import load_dotenv
-import logging
+from .pterodactyl_client import PterodactylAPIError, PterodactylClient
+from .server_inventory import ServerInventory
+from .bulk_power import run_bulk_power
+from .server_monitor import ServerMonitor, format_bytes, stats_embed
+from .resource_history import ResourceHistory, sparkline
+from .idle_policy import IdlePolicy, IdlePolicyEngine, IdlePolicyStore, rcon_hosts_allowed
+from .power_tracker import PowerTracker
+from .bulk_power import SIGNAL_TARGET_STATES
+from core.authorization import NotPrivileged, privileged
+import asyncio
+import time
+from typing import Literal
+
+# slash command interactions need no intents, the bot connects with the union of every cog's
+REQUIRED_INTENTS = discord.Intents.none()
 
 
 class QuantumPterodactyl(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        # We will use the same logger as we use for the client in QCAdmin loaded cogs
-        self.logger = bot.logger
-        load_dotenv()
+        # A child of the QCAdmin bot logger, records go through its queue and are tagged with the cog name
+        self.logger = bot.logger.getChild("quantum_pterodactyl")
         self.api_key = os.getenv("PTERODACTYL_API_KEY")
         self.panel_url = os.getenv("PTERODACTYL_PANEL_URL")
         self.server_id = os.getenv("PTERODACTYL_SERVER_ID")
@@ -29,6 +40,206 @@ class QuantumPterodactyl(commands.Cog):
             self.logger.error("Missing required Pterodactyl dotenv variables")
             raise ValueError("Missing required Pterodactyl dotenv variables")
 
+        # on a reload the previous instance hands over its session, websockets, history and running trackers
+        handoff = bot.handoff.receive(self)
+        # Pterodactyl throttles each API key, the defaults match the panel's client API limit.
+        # The processes of a sharded bot share the key, each gets an equal part of the limit
+        self.client = handoff.get(
+            "client",
+            lambda: PterodactylClient(
+                self.panel_url,
+                self.api_key,
+                self.logger,
+                requests_per_minute=max(int(os.getenv("PTERODACTYL_RATE_LIMIT", "720")) // bot.process_count, 1),
+                burst=max(int(os.getenv("PTERODACTYL_RATE_BURST", "60")) // bot.process_count, 1),
+                max_retries=int(os.getenv("PTERODACTYL_MAX_RETRIES", "4")),
+                timeout=float(os.getenv("PTERODACTYL_TIMEOUT_SECONDS", "15")),
+                breaker=bot.health.register(
+                    "pterodactyl", timeout=float(os.getenv("PTERODACTYL_TIMEOUT_SECONDS", "15"))
+                ),
+            ),
+        )
+        self.inventory = handoff.get("inventory", lambda: ServerInventory(self.client, self.logger))
+        self.monitor = handoff.get(
+            "monitor",
+            lambda: ServerMonitor(
+                self.client,
+                self.logger,
+                idle_seconds=float(os.getenv("PTERODACTYL_MONITOR_IDLE_SECONDS", "900")),
+            ),
+        )
+        # with monitor-all set, every server in the inventory keeps a websocket open permanently
+        self.monitor_all = os.getenv("PTERODACTYL_MONITOR_ALL", "false").lower() == "true"
+        # minimum seconds between edits of a /server watch embed, Discord rate limits message edits
+        self.watch_edit_interval = float(os.getenv("PTERODACTYL_WATCH_EDIT_SECONDS", "5"))
+        # history keeps retention / interval samples per server and metric, for at most max_servers servers
+        self.history_interval = float(os.getenv("PTERODACTYL_HISTORY_INTERVAL_SECONDS", "30"))
+        self.history_minutes = float(os.getenv("PTERODACTYL_HISTORY_MINUTES", "60"))
+        self.history = handoff.get(
+            "history",
+            lambda: ResourceHistory(
+                capacity=max(int(self.history_minutes * 60 / self.history_interval), 1),
+                max_servers=int(os.getenv("PTERODACTYL_HISTORY_MAX_SERVERS", "100")),
+            ),
+        )
+        self.poll_resources.change_interval(seconds=self.history_interval)
+        # in a sharded bot only the primary process polls the panel, the others follow its snapshots
+        if bot.primary:
+            self.poll_resources.start()
+        # power commands follow the server until it settles, giving up after this many seconds
+        self.power_timeout = float(os.getenv("PTERODACTYL_POWER_TIMEOUT_SECONDS", "300"))
+        self.power_tracker = handoff.get("power_tracker", lambda: PowerTracker(self.client, self.monitor, self.logger))
+        self.idle_policies = IdlePolicyStore(
+            os.getenv("PTERODACTYL_IDLE_POLICIES_PATH", "pterodactyl_idle_policies.json"), self.logger
+        )
+        self.idle_policies.load()
+        self.idle_engine = handoff.get(
+            "idle_engine", lambda: IdlePolicyEngine(self.client, self.monitor, self.idle_policies, self.logger)
+        )
+        # a handed-off engine keeps its idle timers but reads the policies just loaded from disk
+        self.idle_engine.store = self.idle_policies
+        # after a restart, autocomplete and the player counts are served from the last snapshot until refreshed
+        bot.snapshots.register(
+            "pterodactyl_inventory",
+            2,
+            self.inventory.dump,
+            self.inventory.restore,
+            restore="inventory" not in handoff.taken,
+        )
+        bot.snapshots.register(
+            "pterodactyl_players",
+            1,
+            lambda: {server_id: list(entry) for server_id, entry in self.idle_engine.player_counts.items()},
+            self._restore_player_counts,
+            max_age=float(os.getenv("PTERODACTYL_PLAYERS_SNAPSHOT_MAX_AGE_MINUTES", "15")) * 60,
+            restore="idle_engine" not in handoff.taken,
+        )
+        bot.snapshots.register(
+            "pterodactyl_history",
+            1,
+            self.history.dump,
+            self.history.restore,
+            restore="history" not in handoff.taken,
+        )
+        # in a sharded bot only the primary process stops idle servers
+        if bot.primary:
+            self.apply_idle_policies.start()
+        self.refresh_inventory.change_interval(
+            minutes=float(os.getenv("PTERODACTYL_INVENTORY_REFRESH_MINUTES", "5"))
+        )
+        self.refresh_inventory.start()
+        bot.metrics.source(
+            "qcbot_pterodactyl_rate_limit_tokens",
+            "Requests left in the panel rate limit bucket",
+            lambda: self.client.bucket.tokens,
+        )
+        bot.metrics.source(
+            "qcbot_pterodactyl_power_trackers", "Power transitions being followed", lambda: len(self.power_tracker.active())
+        )
+        bot.metrics.source("qcbot_pterodactyl_websockets", "Open server websocket streams", lambda: self.monitor.stream_count)
+        bot.metrics.source("qcbot_pterodactyl_servers", "Servers in the inventory", lambda: len(self.inventory.servers))
+        bot.metrics.source("qcbot_pterodactyl_history_bytes", "Memory used by the resource history", lambda: self.history.nbytes)
+
+    def handoff_export(self) -> dict:
+        """The resources a reloaded instance takes over instead of starting cold"""
+        return {
+            "client": self.client,
+            "inventory": self.inventory,
+            "monitor": self.monitor,
+            "history": self.history,
+            "power_tracker": self.power_tracker,
+            "idle_engine": self.idle_engine,
+        }
+
+    def _restore_player_counts(self, data: dict, saved_at: float):
+        for server_id, (count, names, seen_at) in data.items():
+            self.idle_engine.player_counts.setdefault(server_id, (count, names, seen_at))
+
+    async def cog_unload(self):
+        self.bot.metrics.remove_sources("qcbot_pterodactyl_")
+        await self.bot.snapshots.save("pterodactyl_", forget=True)
+        self.refresh_inventory.cancel()
+        self.poll_resources.cancel()
+        self.apply_idle_policies.cancel()
+        # anything being handed to the reloaded instance stays open
+        for resource in (self.idle_engine, self.monitor, self.client):
+            if not self.bot.handoff.holds(resource):
+                await resource.close()
+
+    @tasks.loop(minutes=5)
+    async def refresh_inventory(self):
+        """Keeps the server inventory fresh in the background"""
+        if not self.bot.primary:
+            # the primary's inventory, resource history and player counts, as of its last snapshot
+            await self.bot.snapshots.reload("pterodactyl_")
+            return
+        try:
+            await self.inventory.refresh()
+        except Exception as e:
+            self.logger.error(f"Error refreshing Pterodactyl inventory: {e}")
+            return
+        if self.monitor_all:
+            for identifier in self.inventory.servers:
+                self.monitor.watch(identifier, keep_alive=True)
+
+    @tasks.loop(seconds=30)
+    async def poll_resources(self):
+        """Samples the CPU and memory of the servers the resource history tracks or has room for"""
+        # servers that left the inventory stop taking up history
+        tracked = self.history.servers()
+        for server_id in tracked - set(self.inventory.servers):
+            self.history.forget(server_id)
+            tracked.discard(server_id)
+        # the history drops servers beyond its cap, so they aren't polled at all
+        untracked = [server_id for server_id in self.inventory.servers if server_id not in tracked]
+        server_ids = sorted(tracked) + untracked[: self.history.free_slots]
+        # spread the requests over the interval instead of spending the rate limit bucket in one burst
+        spacing = self.history_interval / max(len(server_ids), 1)
+
+        async def sample(server_id: str, delay: float):
+            await asyncio.sleep(delay)
+            stats = self.monitor.snapshots.get(server_id)
+            # a live websocket already has fresher numbers than /resources, so skip the request
+            if stats is not None and stats.live and stats.age < self.history_interval:
+                self.history.record(server_id, stats.cpu, stats.memory_bytes)
+                return
+            try:
+                resources = await self.client.get_resources(server_id)
+            except Exception as e:
+                self.logger.warning(f"Resource poll failed for server {server_id}: {e}")
+                return
+            usage = resources.get("resources", {})
+            self.history.record(server_id, usage.get("cpu_absolute", 0), usage.get("memory_bytes", 0))
+
+        await asyncio.gather(*(sample(server_id, index * spacing) for index, server_id in enumerate(server_ids)))
+
+    @tasks.loop(minutes=1)
+    async def apply_idle_policies(self):
+        """Stops servers that have been running without players for longer than their idle policy allows"""
+        # policies may have been set or removed by another process of a sharded bot
+        await self.idle_policies.refresh()
+        await self.idle_engine.tick()
+
+    async def server_autocomplete(
+        self, Interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        """Suggests servers from the in-memory inventory by name, identifier or UUID"""
+        return [
+            app_commands.Choice(name=server.label[:100], value=server.identifier)
+            for server in self.inventory.search(current)
+        ]
+
+    def _resolve_server_id(self, server_id: str) -> str:
+        """Maps a typed name or UUID to the server identifier, passing unknown values through to the panel"""
+        server = self.inventory.resolve(server_id)
+        return server.identifier if server else server_id
+
+    def _known(self, server_id: str) -> bool:
+        """Whether a resolved server id is in the inventory, assumed until the inventory has loaded
+        Websocket streams are only opened for known servers, a typo must not reconnect until it goes idle.
+        """
+        return self.inventory.refreshed_at is None or server_id in self.inventory.servers
+
     @app_commands.command(
         name="commands", description="List all QuantumPterodactyl commands"
     )
@@ -41,6 +252,11 @@ class QuantumPterodactyl(commands.Cog):
             "/power stop <serverid:str> - Stops the game server gracefully",
             "/power restart <serverid:str> - Restarts the game server",
             "/power kill <serverid:str> - Forcefully stops the game server",
+            "/power bulk <signal> <targets> [concurrency] [rolling] - Send a power signal to many servers",
+            "/server watch <serverid:str> [minutes] - Live resource usage, updated in place",
+            "/server history <serverid:str> [minutes] - CPU and memory sparklines",
+            "/server wake <serverid:str> - Start a server and get pinged once it is running",
+            "/server idle set|remove|list - Idle auto-shutdown policies",
             "/commands - Lists all available QuantumPterodactyl commands",
         ]
         commands_message = "\n".join(commands_list)
@@ -66,217 +282,500 @@ class QuantumPterodactyl(commands.Cog):
             signal (str): One of 'start', 'stop', 'restart', 'kill'
             server_id (str): The server ID to target for the power signal
         """
-        url = f"{self.panel_url}/api/client/servers/{server_id}/power"
-        print(f'Sending {signal} signal to server {server_id}...') #! Debug Print
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        }
-        data = {"signal": signal}
-
+        self.logger.debug(f'Sending {signal} signal to server {server_id}...')
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers, json=data) as response:
-                    if response.status == 204:  # Success with no content
-                        print(f'Successfully sent {signal} signal to server {server_id}') #! Debug Print
-                        self.logger.info(
-                            f"Successfully sent {signal} signal to server {server_id}"
-                        )
-                        return (
-                            True,
-                            f"Successfully sent {signal} signal to server {server_id}",
-                        )
-                    else:
-                        error_text = await response.text()
-                        print(f'Pterodactyl API error: {error_text}') #! Debug Print
-                        self.logger.error(f"Pterodactyl API error: {error_text}")
-                        return (
-                            False,
-                            f"Failed to send {signal} signal. Status: {response.status}",
-                        )
+            await self.client.send_power_signal(server_id, signal)
+            self.logger.info(f"Successfully sent {signal} signal to server {server_id}")
+            return True, f"Successfully sent {signal} signal to server {server_id}"
+        except PterodactylAPIError as e:
+            self.logger.error(f"Pterodactyl API error: {e.message}")
+            return False, f"Failed to send {signal} signal. Status: {e.status}"
         except Exception as e:
-            print(f'Error sending power signal to server {server_id}: {str(e)}') #! Debug Print
             self.logger.error(
                 f"Error sending power signal to server {server_id}: {str(e)}"
             )
             return False, f"Error occurred: {str(e)}"
 
+    async def _report_transition(self, message: discord.WebhookMessage, signal: str, server_id: str, text: str):
+        """Follows the server to the state the signal leads to and edits the reply with the outcome"""
+        target_state = SIGNAL_TARGET_STATES[signal]
+        result = await self.power_tracker.track(
+            server_id, target_state, self.power_timeout, leave_first=signal == "restart"
+        )
+        if result.reached:
+            outcome = f"✅ `{server_id}` is {target_state} after {result.elapsed:.0f}s"
+        else:
+            outcome = f"⌛ `{server_id}` not {target_state} after {int(self.power_timeout)}s, last seen `{result.state}`"
+        try:
+            await message.edit(content=f"{text}\n{outcome}")
+        except discord.HTTPException as e:
+            # the interaction token expires after 15 minutes, the outcome is still logged by the tracker
+            self.logger.warning(f"Could not update power reply for server {server_id}: {e}")
+
     power = app_commands.Group(name="power", description="Control server power state.")
 
     @power.command(name="start")
-    @app_commands.checks.has_permissions(administrator=True)
+    @privileged()
+    @app_commands.autocomplete(server_id=server_autocomplete)
     async def start_server(self, Interaction: discord.Interaction, server_id: str):
         """Starts the specified game server"""
         await Interaction.response.defer()  # Discord: always defer the response when using Interactions that may take longer than 3 seconds to respond
+        server_id = self._resolve_server_id(server_id)
 
         success, message = await self._send_power_signal("start", server_id)
 
         if success:
-            await Interaction.followup.send(f"🟢 Server `{server_id}` is starting up...")
-            print(f'Successfully started server {server_id}') #! Debug Print
+            text = f"🟢 Server `{server_id}` is starting up..."
+            message = await Interaction.followup.send(text, wait=True)
             self.logger.info(f"Server `{server_id}` is starting up")
+            await self._report_transition(message, "start", server_id, text)
         else:
             await Interaction.followup.send(
                 f"❌ Failed to start server `{server_id}`: {message}"
             )
-            print(f'Failed to start server {server_id}: {message}') #! Debug Print
             self.logger.error(f"Failed to start server `{server_id}`: {message}")
 
     @power.command(name="stop")
-    @app_commands.checks.has_permissions(administrator=True)
+    @privileged()
+    @app_commands.autocomplete(server_id=server_autocomplete)
     async def stop_server(self, Interaction: discord.Interaction, server_id: str):
         """Stops the specified game server gracefully"""
         await Interaction.response.defer()
+        server_id = self._resolve_server_id(server_id)
 
         success, message = await self._send_power_signal("stop", server_id)
 
         if success:
-            await Interaction.followup.send(
-                f"🔴 Server `{server_id}` is shutting down..."
-            )
-            print(f'Successfully stopped server {server_id}') #! Debug Print
+            text = f"🔴 Server `{server_id}` is shutting down..."
+            message = await Interaction.followup.send(text, wait=True)
             self.logger.info(f"Server `{server_id}` is shutting down")
+            await self._report_transition(message, "stop", server_id, text)
         else:
             await Interaction.followup.send(
                 f"❌ Failed to stop server `{server_id}`: {message}"
             )
-            print(f'Failed to stop server {server_id}: {message}') #! Debug Print
             self.logger.error(f"Failed to stop server `{server_id}`: {message}")
 
     @power.command(name="restart")
-    @app_commands.checks.has_permissions(administrator=True)
+    @privileged()
+    @app_commands.autocomplete(server_id=server_autocomplete)
     async def restart_server(self, Interaction: discord.Interaction, server_id: str):
         """Restarts the specified game server"""
         await Interaction.response.defer()
+        server_id = self._resolve_server_id(server_id)
 
         success, message = await self._send_power_signal("restart", server_id)
 
         if success:
-            await Interaction.followup.send(f"🔄 Server `{server_id}` is restarting...")
-            print(f'Successfully restarted server {server_id}') #! Debug Print
+            text = f"🔄 Server `{server_id}` is restarting..."
+            message = await Interaction.followup.send(text, wait=True)
             self.logger.info(f"Server `{server_id}` is restarting")
+            await self._report_transition(message, "restart", server_id, text)
         else:
             await Interaction.followup.send(
                 f"❌ Failed to restart server `{server_id}`: {message}"
             )
-            print(f'Failed to restart server {server_id}: {message}') #! Debug Print
             self.logger.error(f"Failed to restart server `{server_id}`: {message}")
 
     @power.command(name="kill")
-    @app_commands.checks.has_permissions(administrator=True)
+    @privileged()
+    @app_commands.autocomplete(server_id=server_autocomplete)
     async def kill_server(self, Interaction: discord.Interaction, server_id: str):
         """Forcefully stops the specified game server"""
         await Interaction.response.defer()
+        server_id = self._resolve_server_id(server_id)
 
         success, message = await self._send_power_signal("kill", server_id)
 
         if success:
-            await Interaction.followup.send(
-                f"⚠️ Server `{server_id}` has been forcefully stopped!"
-            )
-            print(f'Successfully killed server {server_id}') #! Debug Print
+            text = f"⚠️ Server `{server_id}` has been forcefully stopped!"
+            message = await Interaction.followup.send(text, wait=True)
             self.logger.warning(f"Server `{server_id}` has been forcefully stopped")
+            await self._report_transition(message, "kill", server_id, text)
         else:
             await Interaction.followup.send(
                 f"❌ Failed to kill server `{server_id}`: {message}"
             )
-            print(f'Failed to kill server {server_id}: {message}') #! Debug Print
             self.logger.error(f"Failed to kill server `{server_id}`: {message}")
 
     @power.command(name="state")
-    @app_commands.checks.has_permissions(administrator=True)
+    @privileged()
+    @app_commands.autocomplete(server_id=server_autocomplete)
     async def power_state(self, Interaction: discord.Interaction, server_id: str):
         """Fetches and displays the current power state of the specified server"""
         await Interaction.response.defer()
+        server_id = self._resolve_server_id(server_id)
 
-        url = f"{self.panel_url}/api/client/servers/{server_id}/resources"
-        print(f'url is {url}') #! Debug Print
-        print(f'Fetching power state for server {server_id}...') #! Debug Print
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-        }
+        # Answer from the live websocket snapshot when there is one, only falling back to the API when cold
+        if self._known(server_id):
+            self.monitor.watch(server_id)
+        stats = self.monitor.snapshot(server_id)
+        if stats is not None and stats.version and stats.age < 60:
+            await Interaction.followup.send(
+                f"The current power state of server `{server_id}` is: `{stats.state}`"
+            )
+            self.logger.info(f"Power state of server `{server_id}` answered from snapshot: {stats.state}")
+            return
 
+        self.logger.debug(f'Fetching power state for server {server_id}...')
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        print(f'Successfully fetched power state for server {server_id}') #! Debug Print
-                        data = await response.json()
-                        power_state = data.get("attributes", {}).get(
-                            "current_state", "Unknown"
-                        )
-
-                        # Send the power state as a message
-                        await Interaction.followup.send(
-                            f"The current power state of server `{server_id}` is: `{power_state}`"
-                        )
-                        print(f'Power state fetched for server {server_id}: {power_state}') #! Debug Print
-                        self.logger.info(
-                            f"Power state fetched for server `{server_id}`: {power_state}"
-                        )
-                    else:
-                        error_text = await response.text()
-                        print(f'Pterodactyl API error: {error_text}') #! Debug Print
-                        self.logger.error(f"Pterodactyl API error: {error_text}")
-                        await Interaction.followup.send(
-                            f"❌ Failed to fetch power state. Status: {response.status}"
-                        )
+            resources = await self.client.get_resources(server_id)
+            self.monitor.seed(server_id, resources)
+            power_state = resources.get("current_state", "Unknown")
+
+            # Send the power state as a message
+            await Interaction.followup.send(
+                f"The current power state of server `{server_id}` is: `{power_state}`"
+            )
+            self.logger.info(
+                f"Power state fetched for server `{server_id}`: {power_state}"
+            )
+        except PterodactylAPIError as e:
+            self.logger.error(f"Pterodactyl API error: {e.message}")
+            await Interaction.followup.send(
+                f"❌ Failed to fetch power state. Status: {e.status}"
+            )
         except Exception as e:
-            print(f'Error fetching power state for server {server_id}: {str(e)}') #! Debug Print
             self.logger.error(
                 f"Error fetching power state for server `{server_id}`: {str(e)}"
             )
             await Interaction.followup.send(f"❌ Error occurred: {str(e)}")
 
+    async def _resolve_bulk_targets(self, targets: str) -> tuple[list, list]:
+        """Resolves 'all', 'tag:<tag>' or a comma separated list of servers against the inventory
+        Returns the matched servers and any names that could not be found
+        """
+        if self.inventory.refreshed_at is None:
+            await self.inventory.refresh()
+        targets = targets.strip()
+        if targets.lower() == "all":
+            return list(self.inventory.servers.values()), []
+        if targets.lower().startswith("tag:"):
+            return self.inventory.tagged(targets[len("tag:"):]), []
+        servers, unknown = [], []
+        for value in (part.strip() for part in targets.split(",") if part.strip()):
+            server = self.inventory.resolve(value)
+            if server is None:
+                unknown.append(value)
+            elif server not in servers:
+                servers.append(server)
+        return servers, unknown
+
+    @power.command(name="bulk", description="Send a power signal to many servers at once")
+    @privileged()
+    async def bulk_power(
+        self,
+        Interaction: discord.Interaction,
+        signal: Literal["start", "stop", "restart", "kill"],
+        targets: str,
+        concurrency: app_commands.Range[int, 1, 25] = 5,
+        rolling: bool = False,
+    ):
+        """Sends a power signal to a list of servers, a tag or all of them
+        targets is 'all', 'tag:<tag>' (from #tags in the server description) or comma separated servers.
+        With rolling set, each of the concurrency slots waits for its server to finish before moving on.
+        """
+        await Interaction.response.defer()
+
+        try:
+            servers, unknown = await self._resolve_bulk_targets(targets)
+        except PterodactylAPIError as e:
+            self.logger.error(f"Pterodactyl API error: {e.message}")
+            await Interaction.followup.send(f"❌ Failed to load the server list. Status: {e.status}")
+            return
+        if not servers:
+            await Interaction.followup.send(f"❌ No servers matched `{targets}`.")
+            return
+
+        self.logger.info(
+            f"{Interaction.user} started bulk {signal} on {len(servers)} servers (concurrency {concurrency}, rolling {rolling})"
+        )
+        # a rolling run can outlast the 15 minute interaction token, so it reports in a channel message instead of
+        # the interaction followup, like /server watch
+        status, done = None, []
+        if rolling:
+            status = await Interaction.channel.send(
+                f"⏳ Bulk {signal} on {len(servers)} servers for {Interaction.user.mention}: 0/{len(servers)} done"
+            )
+            await Interaction.followup.send(f"Rolling {signal} started, progress is posted in {status.jump_url}")
+
+        async def report_progress(result):
+            done.append(result)
+            try:
+                await status.edit(
+                    content=f"⏳ Bulk {signal} on {len(servers)} servers for {Interaction.user.mention}: "
+                    f"{len(done)}/{len(servers)} done, last {result.server.name}: {result.message}"
+                )
+            except discord.HTTPException as e:
+                self.logger.warning(f"Could not update bulk {signal} progress: {e}")
+
+        results = await run_bulk_power(
+            self.client,
+            self.logger,
+            signal,
+            servers,
+            concurrency=concurrency,
+            rolling=rolling,
+            timeout=self.power_timeout,
+            tracker=self.power_tracker,
+            on_result=report_progress if status is not None else None,
+        )
+
+        succeeded = [result for result in results if result.success]
+        failed = [result for result in results if not result.success]
+        embed = discord.Embed(
+            title=f"Bulk {signal}: {len(succeeded)}/{len(results)} succeeded",
+            color=discord.Color.green() if not failed else discord.Color.orange() if succeeded else discord.Color.red(),
+        )
+        if succeeded:
+            lines = "\n".join(
+                f"✅ {result.server.name}: {result.message} ({result.elapsed:.1f}s)" for result in succeeded
+            )
+            embed.add_field(name="Succeeded", value=lines[:1024], inline=False)
+        if failed:
+            lines = "\n".join(f"❌ {result.server.name}: {result.message}" for result in failed)
+            embed.add_field(name="Failed", value=lines[:1024], inline=False)
+        if unknown:
+            embed.add_field(name="Not found", value=", ".join(unknown)[:1024], inline=False)
+        if status is None:
+            await Interaction.followup.send(embed=embed)
+            return
+        try:
+            await status.edit(content=f"Bulk {signal} for {Interaction.user.mention} finished.", embed=embed)
+        except discord.NotFound:
+            await Interaction.channel.send(embed=embed)
+
     server = app_commands.Group(name="server", description="Server information.")
 
     @server.command(name="list", description="List all game servers")
-    @app_commands.checks.has_permissions(administrator=True, manage_guild=True)
-    async def list_servers(self, Interaction: discord.Interaction):
+    @privileged()
+    async def list_servers(self, Interaction: discord.Interaction, refresh: bool = False):
         """
-        Lists all servers associated with the Pterodactyl panel.
+        Lists all servers associated with the Pterodactyl panel, from the in-memory inventory.
         """
         await Interaction.response.defer()
 
-        url = f"{self.panel_url}/api/client"
-        print(f'url is {url}') #! Debug Print
-        print(f'Fetching server list from {url}') #! Debug Print
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Accept": "application/json",
-        }
-
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        print(f'Successfully fetched server list') #! Debug Print
-                        data = await response.json()
-                        server_list = [
-                            f"{server['attributes']['name']} (ID: {server['attributes']['identifier']})"
-                            for server in data["data"]
-                        ]
-                        formatted_list = "\n".join(server_list)
-                        await Interaction.followup.send(
-                            f"**Servers:**\n{formatted_list}"
-                        )
-                    else:
-                        error_text = await response.text()
-                        print(f'Pterodactyl API error: {error_text}') #! Debug Print
-                        self.logger.error(f"Pterodactyl API error: {error_text}")
-                        await Interaction.followup.send(
-                            f"❌ Failed to list servers. Status: {response.status}"
-                        )
+            if refresh or self.inventory.refreshed_at is None:
+                await self.inventory.refresh()
+            server_list = [server.label for server in self.inventory.servers.values()]
+            formatted_list = "\n".join(server_list)
+            # Discord messages are capped at 2000 characters
+            if len(formatted_list) > 1900:
+                formatted_list = formatted_list[:1900].rsplit("\n", 1)[0] + "\n..."
+            await Interaction.followup.send(f"**Servers ({len(server_list)}):**\n{formatted_list}")
+        except PterodactylAPIError as e:
+            self.logger.error(f"Pterodactyl API error: {e.message}")
+            await Interaction.followup.send(
+                f"❌ Failed to list servers. Status: {e.status}"
+            )
         except Exception as e:
-            print(f'Error listing servers: {str(e)}')
             self.logger.error(f"Error listing servers: {str(e)}")
             await Interaction.followup.send(f"❌ Error occurred: {str(e)}")
 
+    @server.command(name="watch", description="Show live resource usage of a server")
+    @privileged()
+    @app_commands.autocomplete(server_id=server_autocomplete)
+    async def watch_server(
+        self,
+        Interaction: discord.Interaction,
+        server_id: str,
+        minutes: app_commands.Range[int, 1, 60] = 10,
+    ):
+        """Posts one embed with the server's live resources and keeps it updated in place"""
+        server_id = self._resolve_server_id(server_id)
+        if not self._known(server_id):
+            await Interaction.response.send_message(f"❌ No server `{server_id}` on the panel.", ephemeral=True)
+            return
+        server = self.inventory.resolve(server_id)
+        title = server.label if server else f"Server {server_id}"
+        self.monitor.watch(server_id)
+        stats = self.monitor.snapshot(server_id)
+        await Interaction.response.send_message(
+            f"Watching `{server_id}` for {minutes} minutes.", ephemeral=True
+        )
+        # a channel message rather than the interaction followup, followups can't be edited after 15 minutes
+        message = await Interaction.channel.send(embed=stats_embed(title, stats))
+        self.logger.info(f"{Interaction.user} is watching server `{server_id}` for {minutes} minutes")
+
+        deadline = time.monotonic() + minutes * 60
+        shown_version = stats.version
+        while time.monotonic() < deadline:
+            if self.monitor.snapshots.get(server_id) is not stats:
+                # the stream was dropped because the panel doesn't know the server
+                await message.edit(content=f"❌ No server `{server_id}` on the panel.", embed=None)
+                return
+            self.monitor.watch(server_id)
+            await self.monitor.wait_for_update(server_id, timeout=min(30, deadline - time.monotonic()))
+            # coalesce: however many updates arrived, only the latest snapshot is shown, at most once per interval
+            if stats.version != shown_version:
+                shown_version = stats.version
+                try:
+                    await message.edit(embed=stats_embed(title, stats))
+                except discord.NotFound:
+                    return
+                await asyncio.sleep(self.watch_edit_interval)
+        embed = stats_embed(title, stats)
+        embed.set_footer(text="Watch ended")
+        try:
+            await message.edit(embed=embed)
+        except discord.NotFound:
+            pass
+
+    @server.command(name="history", description="Show recent CPU and memory usage of a server")
+    @privileged()
+    @app_commands.autocomplete(server_id=server_autocomplete)
+    async def server_history(
+        self,
+        Interaction: discord.Interaction,
+        server_id: str,
+        minutes: app_commands.Range[int, 1, 1440] = 30,
+    ):
+        """Renders sparklines of the server's CPU and memory over the last N minutes"""
+        server_id = self._resolve_server_id(server_id)
+        server = self.inventory.resolve(server_id)
+        minutes = min(minutes, int(self.history_minutes))
+        embed = discord.Embed(
+            title=f"{server.label if server else server_id} - last {minutes} minutes",
+            color=discord.Color.purple(),
+        )
+        for metric, label, formatter in (
+            ("cpu", "CPU", lambda value: f"{value:.1f}%"),
+            ("memory", "Memory", lambda value: format_bytes(value * 1024 * 1024)),
+        ):
+            values = [value for _, value in self.history.series(server_id, metric, minutes)]
+            if not values:
+                embed.add_field(name=label, value="No samples yet.", inline=False)
+                continue
+            embed.add_field(
+                name=label,
+                value=(
+                    f"```{sparkline(values)}```"
+                    f"min {formatter(min(values))} - avg {formatter(sum(values) / len(values))} - "
+                    f"max {formatter(max(values))} - now {formatter(values[-1])}"
+                ),
+                inline=False,
+            )
+        embed.set_footer(text=f"Sampled every {int(self.history_interval)}s")
+        await Interaction.response.send_message(embed=embed)
+
+    @server.command(name="wake", description="Start a server and get notified once it is running")
+    @app_commands.autocomplete(server_id=server_autocomplete)
+    async def wake_server(self, Interaction: discord.Interaction, server_id: str):
+        """Starts a stopped server on demand and mentions the requester once it is running
+        Anyone may wake a server that has an idle policy, any other server needs a privileged member.
+        """
+        server_id = self._resolve_server_id(server_id)
+        authorization = self.bot.authorization
+        await self.idle_policies.refresh()
+        if server_id not in self.idle_policies.policies and not (
+            isinstance(Interaction.user, discord.Member) and authorization.is_privileged(Interaction.user)
+        ):
+            raise NotPrivileged(authorization.role_names)
+        await Interaction.response.defer()
+        server = self.inventory.resolve(server_id)
+        name = server.name if server else server_id
+        # give the server a full idle period before the policy may stop it again
+        self.idle_engine.grace(server_id)
+
+        try:
+            resources = await self.client.get_resources(server_id)
+            if resources.get("current_state") == "running":
+                await Interaction.followup.send(f"🟢 `{name}` is already running.")
+                return
+            await self.client.send_power_signal(server_id, "start")
+        except PterodactylAPIError as e:
+            self.logger.error(f"Pterodactyl API error: {e.message}")
+            await Interaction.followup.send(f"❌ Failed to wake `{name}`. Status: {e.status}")
+            return
+        self.logger.info(f"{Interaction.user} woke server `{server_id}`")
+        await Interaction.followup.send(f"⏳ Waking `{name}`, you'll be pinged once it is running.")
+
+        result = await self.power_tracker.track(server_id, "running", self.power_timeout)
+        if result.reached:
+            await Interaction.followup.send(
+                f"🟢 {Interaction.user.mention} `{name}` is running (took {int(result.elapsed)}s)."
+            )
+        else:
+            await Interaction.followup.send(
+                f"❌ {Interaction.user.mention} `{name}` is not running after {int(self.power_timeout)}s, last seen `{result.state}`."
+            )
+
+    # discord - idle policy subgroup, /server idle set|remove|list
+    idle = app_commands.Group(
+        name="idle", description="Stop servers automatically when nobody is playing.", parent=server
+    )
+
+    @idle.command(name="set", description="Configure the idle auto-shutdown policy of a server")
+    @privileged()
+    @app_commands.autocomplete(server_id=server_autocomplete)
+    async def idle_set(
+        self,
+        Interaction: discord.Interaction,
+        server_id: str,
+        idle_minutes: app_commands.Range[int, 1, 1440],
+        rcon_host: str,
+        rcon_port: int = 25575,
+        rcon_password_env: str = "RCON_PASSWORD",
+        enabled: bool = True,
+    ):
+        """Stops the server after idle_minutes without players, counted over RCON
+        rcon_password_env names the environment variable holding the RCON password, it is never stored. Only
+        RCON_PASSWORD and RCON_PASSWORD_* are accepted, and rcon_host must be one of the server's addresses.
+        """
+        server_id = self._resolve_server_id(server_id)
+        allowed_hosts = rcon_hosts_allowed(self.inventory.resolve(server_id))
+        if rcon_host not in allowed_hosts:
+            await Interaction.response.send_message(
+                f"❌ `{rcon_host}` is not an address of `{server_id}`. Use one of its allocations"
+                + (f" ({', '.join(f'`{host}`' for host in sorted(allowed_hosts))})" if allowed_hosts else "")
+                + " or ask the operator to add it to RCON_ALLOWED_HOSTS.",
+                ephemeral=True,
+            )
+            return
+        try:
+            policy = IdlePolicy(server_id, idle_minutes, rcon_host, rcon_port, rcon_password_env, enabled)
+        except ValueError as e:
+            await Interaction.response.send_message(f"❌ {e}", ephemeral=True)
+            return
+        await self.idle_policies.set(policy)
+        self.logger.info(f"{Interaction.user} set idle policy for server `{server_id}`: {policy.to_dict()}")
+        await Interaction.response.send_message(
+            f"Idle policy for `{server_id}`: stop after {idle_minutes} minutes without players"
+            + ("" if enabled else " (disabled)")
+        )
+
+    @idle.command(name="remove", description="Remove the idle auto-shutdown policy of a server")
+    @privileged()
+    @app_commands.autocomplete(server_id=server_autocomplete)
+    async def idle_remove(self, Interaction: discord.Interaction, server_id: str):
+        server_id = self._resolve_server_id(server_id)
+        if await self.idle_policies.remove(server_id):
+            self.logger.info(f"{Interaction.user} removed idle policy for server `{server_id}`")
+            await Interaction.response.send_message(f"Idle policy for `{server_id}` removed.")
+        else:
+            await Interaction.response.send_message(f"`{server_id}` has no idle policy.", ephemeral=True)
+
+    @idle.command(name="list", description="Show idle policies and their latest decisions")
+    @privileged()
+    async def idle_list(self, Interaction: discord.Interaction):
+        await self.idle_policies.refresh()
+        embed = discord.Embed(title="Idle Auto-Shutdown Policies", color=discord.Color.purple())
+        for policy in list(self.idle_policies.policies.values())[:25]:
+            server = self.inventory.resolve(policy.server_id)
+            embed.add_field(
+                name=server.label if server else policy.server_id,
+                value=(
+                    f"{'Enabled' if policy.enabled else 'Disabled'}, stop after {policy.idle_minutes} min idle\n"
+                    f"Last decision: {self.idle_engine.last_decision.get(policy.server_id, 'not evaluated yet')}"
+                )[:1024],
+                inline=False,
+            )
+        if not self.idle_policies.policies:
+            embed.description = "No idle policies configured."
+        await Interaction.response.send_message(embed=embed)
+
 
 async def setup(bot):
     await bot.add_cog(QuantumPterodactyl(bot))
     bot.logger.info("Cog loaded: QuantumPterodactyl v0.1")
-    print("Cog loaded: QuantumPterodactyl v0.1") #! Debug Print
@@ -0,0 +1,128 @@
+# ResourceHistory: short-term CPU and memory history of each game server, without a database.
+#
+# Every (server, metric) pair gets a fixed-size ring buffer backed by two flat arrays (timestamps and
+# values), so memory use is capacity * 12 bytes per series and never grows with uptime. The number of
+# tracked servers is capped as well, which bounds the whole history no matter how many servers exist.
+
+import time
+from array import array
+
+HISTORY_METRICS = ("cpu", "memory")
+SPARKLINE_BLOCKS = "▁▂▃▄▅▆▇█"
+
+
+class RingBuffer:
+    """A fixed capacity ring of (timestamp, value) samples stored in typed arrays"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.values = array("f", bytes(4 * capacity))
+        self.head = 0
+        self.count = 0
+
+    def append(self, timestamp: float, value: float):
+        self.timestamps[self.head] = timestamp
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def since(self, timestamp: float) -> list:
+        """Returns the samples newer than timestamp, oldest first"""
+        start = (self.head - self.count) % self.capacity
+        samples = []
+        for offset in range(self.count):
+            index = (start + offset) % self.capacity
+            if self.timestamps[index] >= timestamp:
+                samples.append((self.timestamps[index], self.values[index]))
+        return samples
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamps.itemsize * self.capacity + self.values.itemsize * self.capacity
+
+
+class ResourceHistory:
+    def __init__(self, capacity: int, max_servers: int = 100):
+        self.capacity = capacity
+        self.max_servers = max_servers
+        self._series = {}
+        self._servers = set()
+
+    def servers(self) -> set:
+        return set(self._servers)
+
+    @property
+    def free_slots(self) -> int:
+        """How many more servers can be tracked before record starts dropping them"""
+        return max(self.max_servers - len(self._servers), 0)
+
+    def record(self, server_id: str, cpu: float, memory_bytes: float, timestamp: float = None) -> bool:
+        """Stores one sample of every metric for a server
+        :return: False when the server is not tracked because the server cap is reached
+        """
+        if server_id not in self._servers:
+            if len(self._servers) >= self.max_servers:
+                return False
+            self._servers.add(server_id)
+        timestamp = time.time() if timestamp is None else timestamp
+        # memory is kept in MiB so it fits a float32 without losing meaningful precision
+        for metric, value in (("cpu", cpu), ("memory", memory_bytes / (1024 * 1024))):
+            series = self._series.get((server_id, metric))
+            if series is None:
+                series = self._series[(server_id, metric)] = RingBuffer(self.capacity)
+            series.append(timestamp, value)
+        return True
+
+    def forget(self, server_id: str):
+        self._servers.discard(server_id)
+        for metric in HISTORY_METRICS:
+            self._series.pop((server_id, metric), None)
+
+    def series(self, server_id: str, metric: str, minutes: float) -> list:
+        buffer = self._series.get((server_id, metric))
+        if buffer is None:
+            return []
+        return buffer.since(time.time() - minutes * 60)
+
+    def dump(self) -> list:
+        """Every series as [server_id, metric, timestamps, values], oldest sample first, for the snapshot store"""
+        dumped = []
+        for (server_id, metric), buffer in self._series.items():
+            samples = buffer.since(0)
+            dumped.append([server_id, metric, [sample[0] for sample in samples], [sample[1] for sample in samples]])
+        return dumped
+
+    def restore(self, data: list, saved_at: float):
+        """Replaces the history with dumped series, keeping the newest samples that fit the buffers"""
+        series, servers = {}, set()
+        for server_id, metric, timestamps, values in data:
+            if server_id not in servers and len(servers) >= self.max_servers:
+                continue
+            servers.add(server_id)
+            buffer = series[(server_id, metric)] = RingBuffer(self.capacity)
+            for timestamp, value in zip(timestamps[-self.capacity :], values[-self.capacity :]):
+                buffer.append(timestamp, value)
+        self._series, self._servers = series, servers
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buffer.nbytes for buffer in self._series.values())
+
+
+def sparkline(values: list, width: int = 40) -> str:
+    """Renders values as a line of block characters, averaging them down to at most width characters"""
+    if not values:
+        return ""
+    if len(values) > width:
+        bucket = len(values) / width
+        values = [
+            sum(chunk) / len(chunk)
+            for chunk in (values[int(i * bucket) : int((i + 1) * bucket)] for i in range(width))
+            if chunk
+        ]
+    low, high = min(values), max(values)
+    spread = (high - low) or 1
+    return "".join(
+        SPARKLINE_BLOCKS[int((value - low) / spread * (len(SPARKLINE_BLOCKS) - 1))] for value in values
+    )
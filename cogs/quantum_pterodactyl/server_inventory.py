@@ -0,0 +1,129 @@
+# ServerInventory: an in-memory index of every server the Pterodactyl API key can see.
+#
+# All pages of /api/client are fetched concurrently and indexed by identifier, UUID and name, so
+# server_id autocomplete and lookups are answered from memory instead of the panel API.
+
+import asyncio
+import re
+import time
+
+# Servers are tagged by writing #tag in their panel description, e.g. "Survival world #minecraft #eu"
+TAG_PATTERN = re.compile(r"#([\w-]+)")
+
+
+class GameServer:
+    """The parts of a Pterodactyl server object the cog uses"""
+
+    def __init__(
+        self, identifier: str, uuid: str, name: str, description: str = "", node: str = "", addresses: list = ()
+    ):
+        self.identifier = identifier
+        self.uuid = uuid
+        self.name = name
+        self.description = description or ""
+        self.node = node or ""
+        # the IPs and aliases of the server's allocations and its node's SFTP host
+        self.addresses = set(addresses)
+
+    @classmethod
+    def from_api(cls, attributes: dict):
+        addresses = {(attributes.get("sftp_details") or {}).get("ip")}
+        allocations = (attributes.get("relationships") or {}).get("allocations", {}).get("data", [])
+        for allocation in allocations:
+            addresses.update((allocation["attributes"].get("ip"), allocation["attributes"].get("ip_alias")))
+        return cls(
+            identifier=attributes["identifier"],
+            uuid=attributes.get("uuid", ""),
+            name=attributes.get("name", attributes["identifier"]),
+            description=attributes.get("description", ""),
+            node=attributes.get("node", ""),
+            addresses=[address for address in addresses if address],
+        )
+
+    @property
+    def label(self) -> str:
+        return f"{self.name} (ID: {self.identifier})"
+
+    @property
+    def tags(self) -> set:
+        return {tag.lower() for tag in TAG_PATTERN.findall(self.description)}
+
+
+class ServerInventory:
+    def __init__(self, client, logger):
+        self.client = client
+        self.logger = logger
+        self.servers = {}
+        self._by_uuid = {}
+        self._by_name = {}
+        self.refreshed_at = None
+        self._refresh_lock = asyncio.Lock()
+
+    async def refresh(self):
+        """Fetches every page of the server list and swaps in a freshly built index"""
+        async with self._refresh_lock:
+            first_page = await self.client.list_servers(page=1)
+            total_pages = first_page.get("meta", {}).get("pagination", {}).get("total_pages", 1)
+            # the client's token bucket keeps the concurrent page requests within the panel's rate limit
+            other_pages = await asyncio.gather(
+                *(self.client.list_servers(page=page) for page in range(2, total_pages + 1))
+            )
+            servers = {}
+            for page in [first_page, *other_pages]:
+                for entry in page.get("data", []):
+                    server = GameServer.from_api(entry["attributes"])
+                    servers[server.identifier] = server
+            self._replace(servers, time.time())
+            self.logger.info(f"Pterodactyl inventory refreshed: {len(servers)} servers over {total_pages} pages")
+
+    def _replace(self, servers: dict, refreshed_at: float):
+        # build the new indexes completely before replacing the old ones so lookups never see a partial index
+        self._by_uuid = {server.uuid: server for server in servers.values() if server.uuid}
+        self._by_name = {server.name.lower(): server for server in servers.values()}
+        self.servers = servers
+        self.refreshed_at = refreshed_at
+
+    def dump(self) -> dict:
+        """The index as json-compatible data, for the snapshot store"""
+        return {
+            "refreshed_at": self.refreshed_at,
+            "servers": [
+                [server.identifier, server.uuid, server.name, server.description, server.node, sorted(server.addresses)]
+                for server in self.servers.values()
+            ],
+        }
+
+    def restore(self, data: dict, saved_at: float):
+        """Rebuilds the index from dumped data, the next refresh replaces it with the panel's current list"""
+        servers = {fields[0]: GameServer(*fields) for fields in data["servers"]}
+        self._replace(servers, data["refreshed_at"])
+
+    def resolve(self, value: str):
+        """Finds a server by identifier, UUID or name (case insensitive)
+        :param value: The identifier, UUID or name typed by the user
+        :return: The GameServer, or None if it is not in the inventory
+        """
+        value = value.strip()
+        return (
+            self.servers.get(value)
+            or self._by_uuid.get(value)
+            or self._by_name.get(value.lower())
+        )
+
+    def tagged(self, tag: str) -> list:
+        """Returns the servers carrying a #tag in their description"""
+        tag = tag.strip().lstrip("#").lower()
+        return [server for server in self.servers.values() if tag in server.tags]
+
+    def search(self, current: str, limit: int = 25) -> list:
+        """Returns the servers whose name, identifier or UUID contains the text typed so far"""
+        current = current.strip().lower()
+        matches = [
+            server
+            for server in self.servers.values()
+            if current in server.name.lower()
+            or current in server.identifier.lower()
+            or current in server.uuid.lower()
+        ]
+        matches.sort(key=lambda server: (not server.name.lower().startswith(current), server.name.lower()))
+        return matches[:limit]
@@ -0,0 +1,230 @@
+# ServerMonitor: live resource snapshots pushed from each server's Pterodactyl (Wings) websocket.
+#
+# A stream is opened per watched server and keeps the latest CPU, memory, disk, network and power state in
+# memory, so /power state and /server watch answer from the snapshot instead of polling /resources.
+# Streams opened on demand close again after a period without anyone reading them, and right away when the panel
+# doesn't know the server.
+
+import asyncio
+import json
+import time
+
+import aiohttp
+import discord
+
+from core.health import BackendError, BackendUnavailable
+
+from .pterodactyl_client import PterodactylAPIError
+
+
+class ServerStats:
+    """The latest known resource usage and power state of a server"""
+
+    def __init__(self):
+        self.state = "unknown"
+        self.cpu = 0.0
+        self.memory_bytes = 0
+        self.memory_limit_bytes = 0
+        self.disk_bytes = 0
+        self.rx_bytes = 0
+        self.tx_bytes = 0
+        self.uptime_ms = 0
+        self.updated_at = 0.0
+        # bumped on every update so watchers can tell whether anything new arrived
+        self.version = 0
+        self.live = False
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.updated_at
+
+    def apply_stats(self, stats: dict):
+        """Applies a Wings 'stats' event payload"""
+        self.state = stats.get("state", self.state)
+        self.cpu = stats.get("cpu_absolute", self.cpu)
+        self.memory_bytes = stats.get("memory_bytes", self.memory_bytes)
+        self.memory_limit_bytes = stats.get("memory_limit_bytes", self.memory_limit_bytes)
+        self.disk_bytes = stats.get("disk_bytes", self.disk_bytes)
+        network = stats.get("network", {})
+        self.rx_bytes = network.get("rx_bytes", self.rx_bytes)
+        self.tx_bytes = network.get("tx_bytes", self.tx_bytes)
+        self.uptime_ms = stats.get("uptime", self.uptime_ms)
+
+    def apply_resources(self, attributes: dict):
+        """Applies a /resources API response, used to seed a snapshot before the stream is up"""
+        resources = attributes.get("resources", {})
+        self.state = attributes.get("current_state", self.state)
+        self.cpu = resources.get("cpu_absolute", self.cpu)
+        self.memory_bytes = resources.get("memory_bytes", self.memory_bytes)
+        self.disk_bytes = resources.get("disk_bytes", self.disk_bytes)
+        self.rx_bytes = resources.get("network_rx_bytes", self.rx_bytes)
+        self.tx_bytes = resources.get("network_tx_bytes", self.tx_bytes)
+        self.uptime_ms = resources.get("uptime", self.uptime_ms)
+
+
+def format_bytes(value: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TiB"
+
+
+def stats_embed(title: str, stats: ServerStats) -> discord.Embed:
+    """Builds the embed shown by /server watch and /power state"""
+    colors = {"running": discord.Color.green(), "starting": discord.Color.gold(), "stopping": discord.Color.orange()}
+    embed = discord.Embed(title=title, color=colors.get(stats.state, discord.Color.red()))
+    embed.add_field(name="State", value=stats.state, inline=True)
+    embed.add_field(name="CPU", value=f"{stats.cpu:.1f}%", inline=True)
+    memory = format_bytes(stats.memory_bytes)
+    if stats.memory_limit_bytes:
+        memory += f" / {format_bytes(stats.memory_limit_bytes)}"
+    embed.add_field(name="Memory", value=memory, inline=True)
+    embed.add_field(name="Disk", value=format_bytes(stats.disk_bytes), inline=True)
+    embed.add_field(
+        name="Network", value=f"⬇ {format_bytes(stats.rx_bytes)} ⬆ {format_bytes(stats.tx_bytes)}", inline=True
+    )
+    embed.add_field(name="Uptime", value=f"{stats.uptime_ms // 60000} min", inline=True)
+    embed.set_footer(text=("Live" if stats.live else "Polled") + f" - updated {int(stats.age)}s ago")
+    return embed
+
+
+class ServerMonitor:
+    def __init__(self, client, logger, idle_seconds: float = 900):
+        self.client = client
+        self.logger = logger
+        self.idle_seconds = idle_seconds
+        self.snapshots = {}
+        self._streams = {}
+        self._last_read = {}
+        self._updated = {}
+        # servers whose stream stays open regardless of reads
+        self.keep_alive = set()
+        self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # a separate session from the API client, so the panel API key is never sent to the Wings nodes
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def close(self):
+        for task in self._streams.values():
+            task.cancel()
+        self._streams.clear()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    @property
+    def stream_count(self) -> int:
+        return sum(not task.done() for task in self._streams.values())
+
+    def watch(self, server_id: str, keep_alive: bool = False):
+        """Makes sure a stream is running for the server"""
+        self._last_read[server_id] = time.monotonic()
+        if keep_alive:
+            self.keep_alive.add(server_id)
+        task = self._streams.get(server_id)
+        if task is None or task.done():
+            self.snapshots.setdefault(server_id, ServerStats())
+            self._streams[server_id] = asyncio.create_task(self._stream(server_id))
+
+    def snapshot(self, server_id: str):
+        """Returns the latest ServerStats for a server, or None if it has never been seen"""
+        self._last_read[server_id] = time.monotonic()
+        return self.snapshots.get(server_id)
+
+    def seed(self, server_id: str, attributes: dict):
+        """Fills a snapshot from a /resources response"""
+        stats = self.snapshots.setdefault(server_id, ServerStats())
+        stats.apply_resources(attributes)
+        self._mark_updated(server_id, stats)
+
+    async def wait_for_update(self, server_id: str, timeout: float) -> bool:
+        """Waits until the server's snapshot changes, returning False on timeout"""
+        event = self._updated.setdefault(server_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _mark_updated(self, server_id: str, stats: ServerStats):
+        stats.updated_at = time.monotonic()
+        stats.version += 1
+        # wake everyone waiting on this server, later waiters get a fresh event
+        event = self._updated.pop(server_id, None)
+        if event is not None:
+            event.set()
+
+    def _idle(self, server_id: str) -> bool:
+        if server_id in self.keep_alive:
+            return False
+        return time.monotonic() - self._last_read.get(server_id, 0) > self.idle_seconds
+
+    async def _credentials(self, server_id: str) -> tuple[str, str]:
+        data = await self.client.request("GET", f"/api/client/servers/{server_id}/websocket")
+        return data["data"]["token"], data["data"]["socket"]
+
+    async def _stream(self, server_id: str):
+        """Keeps a websocket open to the server, reconnecting with backoff until it goes idle"""
+        stats = self.snapshots[server_id]
+        backoff = 1
+        while not self._idle(server_id):
+            try:
+                token, socket_url = await self._credentials(server_id)
+                async with self.session.ws_connect(
+                    socket_url, headers={"Origin": self.client.panel_url}, heartbeat=30
+                ) as websocket:
+                    await websocket.send_json({"event": "auth", "args": [token]})
+                    while True:
+                        try:
+                            message = await websocket.receive(timeout=30)
+                        except asyncio.TimeoutError:
+                            # an offline server sends nothing, so idleness is also checked between messages
+                            if self._idle(server_id):
+                                break
+                            continue
+                        if message.type != aiohttp.WSMsgType.TEXT:
+                            break
+                        payload = json.loads(message.data)
+                        event, args = payload.get("event"), payload.get("args") or []
+                        if event == "auth success":
+                            backoff = 1
+                            stats.live = True
+                            await websocket.send_json({"event": "send stats", "args": [None]})
+                        elif event == "stats" and args:
+                            stats.apply_stats(json.loads(args[0]))
+                            self._mark_updated(server_id, stats)
+                        elif event == "status" and args:
+                            stats.state = args[0]
+                            self._mark_updated(server_id, stats)
+                        elif event == "token expiring":
+                            token, _ = await self._credentials(server_id)
+                            await websocket.send_json({"event": "auth", "args": [token]})
+                        elif event in ("token expired", "jwt error"):
+                            break
+                        if self._idle(server_id):
+                            break
+            except asyncio.CancelledError:
+                raise
+            except PterodactylAPIError as e:
+                if e.status in (403, 404):
+                    # a mistyped or deleted server, reconnecting until it goes idle would only hit the panel
+                    self.logger.warning(f"Websocket for server {server_id} dropped, the panel answered {e.status}")
+                    self.snapshots.pop(server_id, None)
+                    self.keep_alive.discard(server_id)
+                    self._streams.pop(server_id, None)
+                    return
+                self.logger.warning(f"Websocket for server {server_id} failed: {e}, reconnecting in {backoff}s")
+            except (aiohttp.ClientError, BackendError, BackendUnavailable, KeyError, ValueError) as e:
+                self.logger.warning(f"Websocket for server {server_id} failed: {e}, reconnecting in {backoff}s")
+            stats.live = False
+            if self._idle(server_id):
+                break
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+        stats.live = False
+        self._streams.pop(server_id, None)
+        self.logger.info(f"Websocket for server {server_id} closed after going idle")
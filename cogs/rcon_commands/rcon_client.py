@@ -0,0 +1,111 @@
+# RconClient: a small asyncio implementation of the Source RCON protocol used by Minecraft.
+#
+# MCRcon does blocking socket I/O and installs a SIGALRM handler, so it can neither run on the event loop
+# without stalling it nor in a worker thread. This client speaks the same protocol over asyncio streams,
+# keeps its connection open between commands and bounds every step with a timeout. Commands go through a
+# circuit breaker so a dead server fails fast instead of timing out on every command.
+
+import asyncio
+import re
+import struct
+
+from core.health import BackendError, CircuitBreaker
+
+PACKET_LOGIN = 3
+PACKET_COMMAND = 2
+
+# "There are 3 of a max of 20 players online: a, b, c" (older servers write "There are 3/20 players online:")
+PLAYER_LIST_PATTERN = re.compile(r"There are (\d+)\D.*?online:?\s*(.*)", re.DOTALL)
+
+
+class RconError(BackendError):
+    """Raised when the RCON server can't be reached, rejects the password or times out"""
+
+
+def parse_player_list(response: str) -> tuple[int, list]:
+    """Parses the response of the 'list' command
+    :param response: The text returned by the server
+    :return: The number of players online and their names
+    """
+    match = PLAYER_LIST_PATTERN.search(response or "")
+    if match is None:
+        raise RconError(f"Unexpected player list response: {response!r}")
+    names = [name.strip() for name in match.group(2).split(",") if name.strip()]
+    return int(match.group(1)), names
+
+
+class RconClient:
+    def __init__(self, host: str, port: int, password: str, timeout: float = 5, breaker: CircuitBreaker = None):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        # a command is a connect, a login and a round trip, each bounded by timeout
+        self.breaker = breaker or CircuitBreaker(f"RCON {host}:{port}", timeout=timeout * 3)
+        self._reader = None
+        self._writer = None
+        self._request_id = 0
+        # one command at a time per connection, responses are matched to requests in order
+        self._lock = asyncio.Lock()
+
+    async def _send(self, packet_type: int, payload: str) -> tuple[int, str]:
+        self._request_id = (self._request_id + 1) % 2**31
+        body = struct.pack("<ii", self._request_id, packet_type) + payload.encode("utf-8") + b"\x00\x00"
+        self._writer.write(struct.pack("<i", len(body)) + body)
+        await asyncio.wait_for(self._writer.drain(), self.timeout)
+        (length,) = struct.unpack("<i", await asyncio.wait_for(self._reader.readexactly(4), self.timeout))
+        data = await asyncio.wait_for(self._reader.readexactly(length), self.timeout)
+        response_id, _ = struct.unpack("<ii", data[:8])
+        return response_id, data[8:-2].decode("utf-8", errors="replace")
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        response_id, _ = await self._send(PACKET_LOGIN, self.password)
+        if response_id == -1:
+            await self.close()
+            raise RconError("RCON login failed, check the password")
+
+    async def command(self, command: str) -> str:
+        """Runs a command on the server, connecting (or reconnecting once) as needed
+        :param command: The command to run, without a leading slash
+        :return: The server's response text
+        """
+        # waiting for the connection is not the server's fault, only the command itself goes through the breaker,
+        # once, reconnect included
+        async with self._lock:
+            return await self.breaker.call(self._command, command)
+
+    async def _command(self, command: str) -> str:
+        for attempt in range(2):
+            try:
+                if self._writer is None:
+                    await self._connect()
+                _, response = await self._send(PACKET_COMMAND, command)
+                return response
+            except RconError:
+                raise
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                # a stale kept-alive connection fails on first use, retry once on a fresh one
+                await self.close()
+                if attempt == 1:
+                    raise RconError(f"RCON {self.host}:{self.port} unavailable: {e!r}") from e
+            except asyncio.CancelledError:
+                # cut off by the breaker's timeout, the late response must not be read as the next command's
+                if self._writer is not None:
+                    self._writer.close()
+                self._reader = self._writer = None
+                raise
+
+    async def player_count(self) -> tuple[int, list]:
+        return parse_player_list(await self.command("list"))
+
+    async def close(self):
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
@@ -0,0 +1,95 @@
+# Authorization: one permission model for every privileged command, app or prefix.
+#
+# A member is privileged when they own the guild or hold a privileged role: a role whose name is configured
+# (Moderation Team, Admin and Owner by default) or that grants administrator. The privileged role IDs of each
+# guild are worked out once and cached, so a check is a few role ID lookups on the member, and the cache of a
+# guild is dropped whenever one of its roles is created, updated or deleted.
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from core.gateway import get_or_fetch_member
+
+DEFAULT_PRIVILEGED_ROLES = ("Moderation Team", "Admin", "Owner")
+
+
+class NotPrivileged(app_commands.CheckFailure, commands.CheckFailure):
+    def __init__(self, role_names):
+        super().__init__(f"This command needs one of these roles: {', '.join(role_names)}.")
+
+
+class Authorization:
+    def __init__(self, bot, role_names=DEFAULT_PRIVILEGED_ROLES):
+        self.role_names = tuple(role_names)
+        self._lowered_names = {name.lower() for name in self.role_names}
+        # guild id -> frozenset of privileged role ids
+        self._privileged = {}
+        for event in ("on_guild_role_create", "on_guild_role_delete"):
+            bot.add_listener(self._on_role_changed, event)
+        bot.add_listener(self._on_role_updated, "on_guild_role_update")
+        bot.add_listener(self._on_guild_remove, "on_guild_remove")
+
+    def privileged_roles(self, guild: discord.Guild) -> frozenset:
+        roles = self._privileged.get(guild.id)
+        if roles is None:
+            roles = self._privileged[guild.id] = frozenset(
+                role.id
+                for role in guild.roles
+                if role.name.lower() in self._lowered_names or role.permissions.administrator
+            )
+        return roles
+
+    def invalidate(self, guild_id: int):
+        self._privileged.pop(guild_id, None)
+
+    async def _on_role_changed(self, role: discord.Role):
+        self.invalidate(role.guild.id)
+
+    async def _on_role_updated(self, before: discord.Role, after: discord.Role):
+        self.invalidate(after.guild.id)
+
+    async def _on_guild_remove(self, guild: discord.Guild):
+        self.invalidate(guild.id)
+
+    def is_privileged(self, member: discord.Member) -> bool:
+        if member.guild.owner_id == member.id:
+            return True
+        return any(member.get_role(role_id) is not None for role_id in self.privileged_roles(member.guild))
+
+
+async def _interaction_is_privileged(interaction: discord.Interaction) -> bool:
+    authorization = interaction.client.authorization
+    # outside a guild there are no roles to hold
+    if not isinstance(interaction.user, discord.Member) or not authorization.is_privileged(interaction.user):
+        raise NotPrivileged(authorization.role_names)
+    return True
+
+
+async def _context_is_privileged(ctx: commands.Context) -> bool:
+    authorization = ctx.bot.authorization
+    member = ctx.author
+    if ctx.guild is not None and not isinstance(member, discord.Member):
+        # members are not cached, see core/gateway.py
+        member = await get_or_fetch_member(ctx.guild, ctx.author.id)
+    if not isinstance(member, discord.Member) or not authorization.is_privileged(member):
+        raise NotPrivileged(authorization.role_names)
+    return True
+
+
+def privileged():
+    """Restricts an app command or a prefix command to privileged members, see Authorization
+    Works above or below the command decorator, like discord.py's own checks.
+    """
+
+    def decorator(func):
+        if isinstance(func, commands.Command):
+            return commands.check(_context_is_privileged)(func)
+        if isinstance(func, (app_commands.Command, app_commands.ContextMenu)):
+            return app_commands.check(_interaction_is_privileged)(func)
+        # still a plain callback, whichever kind of command it becomes picks up its own check
+        commands.check(_context_is_privileged)(func)
+        app_commands.check(_interaction_is_privileged)(func)
+        return func
+
+    return decorator
@@ -0,0 +1,157 @@
+# CogLoader: finds the extensions under cogs/ and loads them all at startup.
+#
+# Each package under cogs/ is scanned for modules defining an async setup(bot), without importing them.
+# The modules are then imported concurrently on worker threads, which pulls in their dependencies off the
+# event loop and overlaps their file I/O, and lets main() read what the cogs declare (REQUIRED_INTENTS) before
+# the bot is built. Finally every setup runs on the loop against the module that was already imported, through
+# discord.py's own extension loading so failures are cleaned up and /cog reload works as usual, without
+# running the module's top level a second time. The import and setup time of each extension is measured, and
+# an extension that fails to import or set up is reported and skipped without stopping the others.
+#
+# Public load_extension always executes the module again, so reusing the imported module goes through the private
+# Bot._load_from_module_spec(spec, key). That is only done on the discord.py versions it was checked against
+# (requirements.txt pins 2.3.2), any other version falls back to load_extension and runs each module twice.
+
+import asyncio
+import importlib
+import importlib.abc
+import importlib.util
+import inspect
+import os
+import re
+import time
+
+import discord
+from discord.ext import commands
+
+SETUP_PATTERN = re.compile(r"^async def setup\(", re.MULTILINE)
+
+# the (major, minor) discord.py versions whose private Bot._load_from_module_spec the loader was checked against
+PRIVATE_LOADER_VERSIONS = {(2, 3)}
+
+
+class CogLoadResult:
+    def __init__(self, extension: str, import_seconds: float, setup_seconds: float = 0.0, error: Exception = None):
+        self.extension = extension
+        self.import_seconds = import_seconds
+        self.setup_seconds = setup_seconds
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def format(self) -> str:
+        timing = f"import {self.import_seconds * 1000:.0f} ms, setup {self.setup_seconds * 1000:.0f} ms"
+        if self.ok:
+            return f"{self.extension}: {timing}"
+        return f"{self.extension}: failed after {timing}: {self.error}"
+
+
+def discover_extensions(directory: str = "cogs", disabled: set = frozenset()) -> list:
+    """Lists the modules under directory's packages that define setup(bot), as dotted extension names
+    :param directory: The cogs directory, its name is used as the package prefix
+    :param disabled: Extension or package names to leave out, e.g. {"cogs.qc_status"}
+    :return: A sorted list, e.g. ["cogs.qc_status.qc_status", ...]
+    """
+    prefix = os.path.basename(os.path.normpath(directory))
+    extensions = []
+    for package in sorted(os.listdir(directory)):
+        package_path = os.path.join(directory, package)
+        if not os.path.isfile(os.path.join(package_path, "__init__.py")) or f"{prefix}.{package}" in disabled:
+            continue
+        for file_name in sorted(os.listdir(package_path)):
+            if not file_name.endswith(".py") or file_name == "__init__.py":
+                continue
+            extension = f"{prefix}.{package}.{file_name[:-3]}"
+            if extension in disabled:
+                continue
+            with open(os.path.join(package_path, file_name), "r", encoding="utf-8") as file:
+                if SETUP_PATTERN.search(file.read()):
+                    extensions.append(extension)
+    return extensions
+
+
+class _ImportedLoader(importlib.abc.Loader):
+    """Hands discord.py a module that import_extensions already imported and executed"""
+
+    def __init__(self, module):
+        self.module = module
+
+    def create_module(self, spec):
+        return self.module
+
+    def exec_module(self, module):
+        pass
+
+
+def _import(extension: str) -> tuple:
+    started = time.perf_counter()
+    try:
+        module = importlib.import_module(extension)
+    except Exception:
+        # load_extension imports it again on the loop and reports the real error
+        module = None
+    return module, time.perf_counter() - started
+
+
+async def import_extensions(extensions: list) -> dict:
+    """Imports the extension modules concurrently on worker threads
+    :return: A dictionary of extension name to (module or None if the import failed, import seconds)
+    """
+    imported = await asyncio.gather(*(asyncio.to_thread(_import, extension) for extension in extensions))
+    return dict(zip(extensions, imported))
+
+
+def reuses_imported_modules(bot) -> bool:
+    """Whether this discord.py version can set up the thread-imported modules without importing them again"""
+    load_from_module_spec = getattr(bot, "_load_from_module_spec", None)
+    if (discord.version_info.major, discord.version_info.minor) not in PRIVATE_LOADER_VERSIONS:
+        return False
+    if load_from_module_spec is None or not inspect.iscoroutinefunction(load_from_module_spec):
+        return False
+    return list(inspect.signature(load_from_module_spec).parameters) == ["spec", "key"]
+
+
+async def _load_extension(bot, extension: str, module, import_seconds: float) -> CogLoadResult:
+    started = time.perf_counter()
+    try:
+        if module is None:
+            await bot.load_extension(extension)
+        else:
+            original_spec = module.__spec__
+            spec = importlib.util.spec_from_loader(extension, _ImportedLoader(module), origin=original_spec.origin)
+            try:
+                # load_extension without its find_spec, it runs setup(bot), registers the extension and
+                # cleans up after a failing setup
+                await bot._load_from_module_spec(spec, extension)
+            finally:
+                module.__spec__ = original_spec
+    except commands.ExtensionError as e:
+        return CogLoadResult(extension, import_seconds, time.perf_counter() - started, e.__cause__ or e)
+    return CogLoadResult(extension, import_seconds, time.perf_counter() - started)
+
+
+async def load_extensions(bot, imported: dict, logger) -> list:
+    """Sets up the imported extensions concurrently, a failing extension never stops the others
+    :param imported: The result of import_extensions
+    :return: A CogLoadResult per extension, in the order given
+    """
+    started = time.perf_counter()
+    if not reuses_imported_modules(bot):
+        logger.warning(
+            f"discord.py {discord.__version__} is not a version the cog loader was checked against, "
+            "extensions are loaded with load_extension and their modules run a second time"
+        )
+        imported = {extension: (None, seconds) for extension, (_, seconds) in imported.items()}
+    results = await asyncio.gather(
+        *(_load_extension(bot, extension, module, seconds) for extension, (module, seconds) in imported.items())
+    )
+    for result in results:
+        if result.ok:
+            logger.info(f"Loaded {result.format()}")
+        else:
+            logger.error(f"Could not load {result.format()}", exc_info=result.error)
+    loaded = sum(result.ok for result in results)
+    logger.info(f"Loaded {loaded}/{len(results)} extensions in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return results
@@ -0,0 +1,82 @@
+# CommandSync: syncs the app command tree with Discord only when it changed.
+#
+# Discord rate-limits command syncs heavily, and a bot restart rarely changes any command. The tree is
+# serialized the way tree.sync() sends it and hashed; the hash of the last successful sync for each scope is
+# kept on disk, and a sync is skipped when the hash matches. With a dev guild set, global commands are copied
+# to that guild and synced there instead, which Discord applies instantly rather than after propagation.
+
+import hashlib
+import json
+import os
+
+import discord
+
+
+class SyncResult:
+    def __init__(self, scope: str, digest: str, synced: int = None):
+        self.scope = scope
+        self.digest = digest
+        # None when the sync was skipped because nothing changed
+        self.synced = synced
+
+    @property
+    def skipped(self) -> bool:
+        return self.synced is None
+
+
+class CommandSync:
+    def __init__(self, bot, logger, path: str, dev_guild_id: int = None):
+        self.bot = bot
+        self.logger = logger
+        self.path = path
+        self.dev_guild = discord.Object(id=dev_guild_id) if dev_guild_id else None
+        self.hashes = self._load()
+
+    @property
+    def scope(self) -> str:
+        return f"guild:{self.dev_guild.id}" if self.dev_guild else "global"
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not read the command sync state from {self.path}, syncing everything: {e}")
+            return {}
+
+    def _save(self):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(self.hashes, file, indent=2)
+        os.replace(temp_path, self.path)
+
+    def digest(self) -> str:
+        """Hashes the commands the next sync would send, in a stable order"""
+        payload = sorted(
+            (command.to_dict() for command in self.bot.tree.get_commands(guild=self.dev_guild)),
+            key=lambda command: (command.get("type", 1), command["name"]),
+        )
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    async def sync(self, force: bool = False) -> SyncResult:
+        """Syncs the tree to the dev guild, or globally without one, unless it is unchanged since the last sync
+        :param force: Sync even when the hash matches, e.g. after commands were changed by hand in Discord
+        :return: A SyncResult
+        """
+        if self.dev_guild:
+            self.bot.tree.copy_global_to(guild=self.dev_guild)
+        digest = self.digest()
+        if not force and self.hashes.get(self.scope) == digest:
+            self.logger.info(f"Command tree unchanged ({digest[:12]}), skipping the {self.scope} sync")
+            return SyncResult(self.scope, digest)
+
+        synced = await self.bot.tree.sync(guild=self.dev_guild)
+        self.hashes[self.scope] = digest
+        try:
+            self._save()
+        except OSError as e:
+            self.logger.warning(f"Could not save the command sync state to {self.path}: {e}")
+        self.logger.info(f"Synced {len(synced)} commands to {self.scope} ({digest[:12]})")
+        return SyncResult(self.scope, digest, len(synced))
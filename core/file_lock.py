@@ -0,0 +1,36 @@
+# FileLock: serializes read-modify-write cycles on a json file that several processes share.
+#
+# In a sharded bot every process may change the report and idle policy files. A store takes the lock, reads
+# the file again, applies its one change on top of what the other processes saved and writes it back, so a
+# save never drops entries another process added since this one last read the file. The lock is held on a
+# separate ".lock" file, the data file itself is still replaced atomically.
+
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path: str):
+    """Holds an exclusive lock for path across processes, blocking until it is free
+    :param path: The shared file, the lock is taken on path + ".lock"
+    """
+    with open(f"{path}.lock", "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
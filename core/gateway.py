@@ -0,0 +1,53 @@
+# Gateway: the intents and caches the bot connects with, kept to what the loaded cogs actually use.
+#
+# The bot is driven by slash commands, whose interactions carry the invoking member with its roles, so it
+# does not need the members or message content intents, member chunking or a message cache. Every cog module
+# declares REQUIRED_INTENTS and the bot connects with their union. Members the cache doesn't hold are fetched
+# from the API when a check needs one.
+
+import discord
+
+# the gateway intents every bot needs, guilds keeps the guild, channel and role caches
+BASE_INTENTS = discord.Intents(guilds=True)
+
+
+def gateway_intents(modules, extra: list = ()) -> discord.Intents:
+    """The union of BASE_INTENTS and the REQUIRED_INTENTS of every module
+    :param modules: Cog modules, None entries (failed imports) are skipped
+    :param extra: Additional intent names, e.g. ["members"]
+    :return: The Intents to build the bot with
+    """
+    intents = discord.Intents.none()
+    intents.value = BASE_INTENTS.value
+    for module in modules:
+        required = getattr(module, "REQUIRED_INTENTS", None)
+        if required is not None:
+            intents.value |= required.value
+    for name in extra:
+        setattr(intents, name, True)
+    return intents
+
+
+def missing_intents(module, intents: discord.Intents) -> list:
+    """The names of the intents a module declares that the bot connected without"""
+    required = getattr(module, "REQUIRED_INTENTS", None)
+    if required is None:
+        return []
+    return [name for name, enabled in required if enabled and not getattr(intents, name)]
+
+
+def enabled_intents(intents: discord.Intents) -> list:
+    return [name for name, enabled in intents if enabled]
+
+
+async def get_or_fetch_member(guild: discord.Guild, user_id: int):
+    """Returns the member from the cache, or fetches it from the API since members are not cached
+    :return: The Member, or None if they are not in the guild
+    """
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+    try:
+        return await guild.fetch_member(user_id)
+    except discord.NotFound:
+        return None
@@ -0,0 +1,133 @@
+# Handoff: carries a cog's long-lived resources over to its new instance when the cog is reloaded.
+#
+# Before a reload, every cog of the extension that defines handoff_export() returns its resources by name
+# (HTTP clients, RCON connections, render caches, trackers with in-flight jobs). cog_unload leaves whatever
+# bot.handoff.holds() open instead of closing it. The new instance builds each resource through
+# bot.handoff.receive(self).get(name, factory), which returns the handed-off object when there is one and only
+# calls the factory when there isn't. A new instance that fails in __init__, cog_load or a later setup step has
+# its task loops cancelled and gives back what it took, so the old module's instance that discord.py sets up
+# again can take it instead. Whatever no instance takes, e.g. because the reload failed for good or the
+# resource was removed, is closed afterwards, and the admin gets a report of what carried over.
+
+import inspect
+
+from discord.ext import tasks
+
+
+class HandoffReport:
+    def __init__(self, extension: str):
+        self.extension = extension
+        # cog name -> resource names the new instance took over
+        self.carried = {}
+        # cog name -> resource names that were closed because nothing took them
+        self.closed = {}
+        self.error = None
+
+    def format(self) -> str:
+        if self.error is None:
+            lines = [f"Reloaded {self.extension}"]
+        else:
+            lines = [f"Failed to reload {self.extension}: {self.error}"]
+        for cog, names in self.carried.items():
+            lines.append(f"{cog}: carried over {', '.join(names)}" if names else f"{cog}: started cold")
+        for cog, names in self.closed.items():
+            lines.append(f"{cog}: closed {', '.join(names)}")
+        return "\n".join(lines)
+
+
+class ReceivedHandoff:
+    """What one new cog instance was handed, see HandoffRegistry.receive"""
+
+    def __init__(self, cog, state: dict):
+        self.cog = cog
+        self.state = state
+        self.taken = []
+        # name -> resource, what this instance took, given back if it fails to load
+        self.took = {}
+
+    def get(self, name: str, factory):
+        """Returns the handed-off resource called name, or factory() when there is none"""
+        if name in self.state:
+            self.taken.append(name)
+            resource = self.took[name] = self.state.pop(name)
+            return resource
+        return factory()
+
+    def give_back(self):
+        """Stops a failed instance's task loops and returns what it took to the handoff state"""
+        for name in dir(type(self.cog)):
+            if isinstance(getattr(type(self.cog), name, None), tasks.Loop):
+                getattr(self.cog, name).cancel()
+        self.state.update(self.took)
+        self.taken, self.took = [], {}
+
+
+class HandoffRegistry:
+    def __init__(self, logger):
+        self.logger = logger
+        # cog name -> {resource name: resource}, only filled while a reload is running
+        self.pending = {}
+        self.received = {}
+
+    def holds(self, resource) -> bool:
+        """True while resource is being handed to a new cog instance, so cog_unload must not close it
+        That includes what a new instance took, it may still fail and give it back.
+        """
+        states = list(self.pending.values()) + [received.took for received in self.received.values()]
+        return any(resource is held for state in states for held in state.values())
+
+    def receive(self, cog) -> ReceivedHandoff:
+        """Called by a cog's __init__, returns what its previous instance handed off (nothing outside a reload)"""
+        if cog.qualified_name not in self.pending:
+            return ReceivedHandoff(cog, {})
+        previous = self.received.get(cog.qualified_name)
+        if previous is not None:
+            # a second instance during one reload means the first failed and discord.py is setting up the old
+            # module again
+            previous.give_back()
+        received = self.received[cog.qualified_name] = ReceivedHandoff(cog, self.pending[cog.qualified_name])
+        return received
+
+    async def _close(self, name: str, resource):
+        close = getattr(resource, "close", None) or getattr(resource, "stop", None)
+        if close is None:
+            return
+        try:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            self.logger.warning(f"Error closing handed-off {name}: {e}")
+
+    async def reload(self, bot, extension: str) -> HandoffReport:
+        """Reloads an extension, handing off the resources its cogs export to their new instances
+        :param bot: The bot
+        :param extension: The extension name, e.g. cogs.quantum_pterodactyl.quantum_pterodactyl
+        :return: A HandoffReport, with error set when the reload failed
+        """
+        report = HandoffReport(extension)
+        for cog in list(bot.cogs.values()):
+            export = getattr(cog, "handoff_export", None)
+            if type(cog).__module__ == extension and export is not None:
+                self.pending[cog.qualified_name] = dict(export())
+        try:
+            await bot.reload_extension(extension)
+        except Exception as e:
+            # discord.py sets the old module up again when the new one fails, that instance can still take over.
+            # If that fails too the error is not an ExtensionError, and the cog is left unloaded
+            report.error = e.__cause__ or e
+        finally:
+            for cog_name, instance in self.received.items():
+                if bot.get_cog(cog_name) is not instance.cog:
+                    instance.give_back()
+            pending, self.pending = self.pending, {}
+            received, self.received = self.received, {}
+
+        for cog_name, leftovers in pending.items():
+            report.carried[cog_name] = received[cog_name].taken if cog_name in received else []
+            if leftovers:
+                report.closed[cog_name] = list(leftovers)
+                for name, resource in leftovers.items():
+                    await self._close(name, resource)
+        self.logger.info(report.format().replace("\n", ", "))
+        return report
@@ -0,0 +1,145 @@
+# HealthRegistry: one circuit breaker per backend (Grafana, Pterodactyl, RCON) shared by every cog.
+#
+# A breaker counts consecutive failures of calls to its backend. After failure_threshold of them it opens
+# and calls fail immediately with BackendUnavailable instead of waiting on a dead backend. Once reset_seconds
+# have passed a single trial call is let through (half-open): success closes the breaker, failure reopens it.
+# Every call is bounded by the breaker's timeout, and call latency is kept for /admin health. Observers are
+# told the outcome and latency of every call, which is how core/metrics.py records backend metrics.
+
+import asyncio
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class BackendError(Exception):
+    """Raised by callers for responses that mean the backend itself is failing, e.g. HTTP 5xx"""
+
+
+class BackendUnavailable(Exception):
+    """Raised instead of calling a backend while its circuit breaker is open"""
+
+    def __init__(self, backend: str, retry_in: float):
+        super().__init__(f"{backend} is currently unavailable, try again in {max(int(retry_in), 1)}s.")
+        self.backend = backend
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30, timeout: float = 15):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.timeout = timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.calls = 0
+        self.rejected = 0
+        self.last_latency = None
+        # exponentially weighted so one slow call doesn't dominate the average
+        self.average_latency = None
+        self.last_error = None
+        self.last_failure_at = None
+        self._trial_running = False
+        # callables taking (backend name, outcome, latency), outcome is success, failure or rejected
+        self.observers = []
+
+    def _notify(self, outcome: str, latency: float):
+        for observer in self.observers:
+            observer(self.name, outcome, latency)
+
+    @property
+    def retry_in(self) -> float:
+        return max(self.opened_at + self.reset_seconds - time.monotonic(), 0)
+
+    def _allow(self) -> bool:
+        """Raises BackendUnavailable while the breaker is open, returns whether the call is the half-open trial"""
+        if self.state == OPEN:
+            if self.retry_in > 0:
+                self.rejected += 1
+                self._notify("rejected", 0)
+                raise BackendUnavailable(self.name, self.retry_in)
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            # only one trial call probes a recovering backend, everyone else keeps failing fast
+            if self._trial_running:
+                self.rejected += 1
+                self._notify("rejected", 0)
+                raise BackendUnavailable(self.name, 1)
+            self._trial_running = True
+            return True
+        return False
+
+    def record_success(self, latency: float):
+        self.last_latency = latency
+        if self.average_latency is None:
+            self.average_latency = latency
+        else:
+            self.average_latency = 0.8 * self.average_latency + 0.2 * latency
+        self.failures = 0
+        self.state = CLOSED
+
+    def record_failure(self, error: BaseException):
+        self.failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        self.last_failure_at = time.time()
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    async def call(self, func, *args, **kwargs):
+        """Runs func(*args, **kwargs) through the breaker
+        :raises BackendUnavailable: Without calling func while the breaker is open
+        :raises BackendError: When the call times out
+        :return: Whatever func returns, exceptions from func are recorded as failures and raised again
+        """
+        trial = self._allow()
+        self.calls += 1
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(func(*args, **kwargs), self.timeout)
+        except asyncio.TimeoutError as e:
+            error = BackendError(f"{self.name} did not answer within {self.timeout:g}s")
+            self.record_failure(error)
+            self._notify("failure", time.monotonic() - started)
+            raise error from e
+        except Exception as e:
+            self.record_failure(e)
+            self._notify("failure", time.monotonic() - started)
+            raise
+        finally:
+            if trial:
+                self._trial_running = False
+        latency = time.monotonic() - started
+        self.record_success(latency)
+        self._notify("success", latency)
+        return result
+
+
+class HealthRegistry:
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30):
+        # defaults for every breaker, backends only choose their own timeout
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.breakers = {}
+        # shared with every registered breaker
+        self.observers = []
+
+    def register(self, name: str, timeout: float = 15) -> CircuitBreaker:
+        """Returns the breaker for a backend, creating it on first use
+        A cog reloading keeps the existing breaker and its state, only the timeout is updated.
+        """
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = self.breakers[name] = CircuitBreaker(
+                name, self.failure_threshold, self.reset_seconds, timeout
+            )
+            breaker.observers = self.observers
+        breaker.timeout = timeout
+        return breaker
+
+    def get(self, name: str):
+        return self.breakers.get(name)
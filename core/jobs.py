@@ -0,0 +1,56 @@
+# JobQueue: runs CPU-bound work (image decoding and hashing) away from the event loop.
+#
+# With JOB_WORKERS set the jobs run on a pool of worker processes, so they use other cores instead of
+# competing with gateway handling for this process's GIL. Without it they run on a worker thread, which still
+# keeps the loop responsive. Jobs wait their turn on a semaphore rather than piling up inside the pool, and
+# must be module-level functions taking and returning picklable values.
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+class JobQueue:
+    def __init__(self, workers: int = 0, logger=None):
+        self.workers = workers
+        self.logger = logger
+        self._slots = asyncio.Semaphore(max(workers, 1) * 2)
+        self._pool = None
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+
+    def _executor(self):
+        if self.workers <= 0:
+            # the loop's default thread pool
+            return None
+        if self._pool is None:
+            # spawned, not forked, so workers don't inherit the bot's threads and sockets
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def run(self, func, *args):
+        """Runs func(*args) on a worker and returns its result
+        :param func: A module-level function, so it can be sent to a worker process
+        """
+        self.pending += 1
+        async with self._slots:
+            self.pending -= 1
+            self.running += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor(), func, *args)
+            except BrokenProcessPool:
+                # a worker died, the next job starts a fresh pool
+                if self.logger is not None:
+                    self.logger.error("A job worker process died, restarting the job pool")
+                self._pool = None
+                raise
+            finally:
+                self.running -= 1
+                self.completed += 1
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,116 @@
+# LogBuffer: the most recent log records kept in memory for /admin logbuffer.
+#
+# A logging handler, fed by the logging pipeline's listener thread, stores each record as a small structured
+# entry in a fixed-capacity deque, so memory use is bounded by capacity * max_message_chars no matter how
+# much the bot logs. Reads take a filtered copy and never remove anything from the buffer.
+
+import gzip
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from io import BytesIO
+
+
+class LogEntry:
+    __slots__ = ("created", "levelno", "levelname", "cog", "message")
+
+    def __init__(self, created: float, levelno: int, levelname: str, cog: str, message: str):
+        self.created = created
+        self.levelno = levelno
+        self.levelname = levelname
+        self.cog = cog
+        self.message = message
+
+    def format(self) -> str:
+        timestamp = datetime.fromtimestamp(self.created, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        return f"{timestamp}:{self.levelname}:{self.cog}: {self.message}"
+
+
+class LogBufferHandler(logging.Handler):
+    def __init__(self, root_name: str, capacity: int = 5000, max_message_chars: int = 2000):
+        super().__init__()
+        self.root_name = root_name
+        self.capacity = capacity
+        self.max_message_chars = max_message_chars
+        self.entries = deque(maxlen=capacity)
+        # records are appended on the listener thread and read on the event loop
+        self._lock = threading.Lock()
+
+    def cog_name(self, logger_name: str) -> str:
+        """quantumly_confused_bot_log.quantum_pterodactyl -> quantum_pterodactyl, the bot logger itself -> bot"""
+        if logger_name.startswith(f"{self.root_name}."):
+            return logger_name[len(self.root_name) + 1 :]
+        return "bot" if logger_name == self.root_name else logger_name
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            message = record.getMessage()
+            if record.exc_info and not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            if record.exc_text and record.exc_text not in message:
+                message = f"{message}\n{record.exc_text}"
+            entry = LogEntry(
+                record.created,
+                record.levelno,
+                record.levelname,
+                self.cog_name(record.name),
+                message[: self.max_message_chars],
+            )
+            with self._lock:
+                self.entries.append(entry)
+        except Exception:
+            self.handleError(record)
+
+    def cogs(self) -> list:
+        with self._lock:
+            return sorted({entry.cog for entry in self.entries})
+
+    def query(
+        self, level: int = logging.NOTSET, cog: str = None, minutes: float = None, text: str = None
+    ) -> list:
+        """Returns the buffered entries matching every filter given, oldest first
+        :param level: The minimum level, e.g. logging.WARNING
+        :param cog: Only entries from this cog
+        :param minutes: Only entries from the last N minutes
+        :param text: Only entries containing this text (case insensitive)
+        :return: A list of LogEntry
+        """
+        with self._lock:
+            entries = list(self.entries)
+        since = time.time() - minutes * 60 if minutes else 0
+        text = text.lower() if text else None
+        return [
+            entry
+            for entry in entries
+            if entry.levelno >= level
+            and entry.created >= since
+            and (cog is None or entry.cog == cog)
+            and (text is None or text in entry.message.lower())
+        ]
+
+
+def build_log_pages(entries: list, page_chars: int = 1900) -> list:
+    """Splits formatted entries into pages that fit a Discord code block, newest page last"""
+    pages, current, size = [], [], 0
+    for entry in entries:
+        line = entry.format()[:page_chars]
+        if current and size + len(line) + 1 > page_chars:
+            pages.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        pages.append("\n".join(current))
+    return pages
+
+
+def export_gzip(entries: list) -> BytesIO:
+    """Writes the entries as a gzip compressed text file"""
+    buffer = BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as file:
+        for entry in entries:
+            file.write(entry.format().encode("utf-8") + b"\n")
+    buffer.seek(0)
+    return buffer
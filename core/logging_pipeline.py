@@ -0,0 +1,91 @@
+# LoggingPipeline: moves log I/O off the event loop.
+#
+# The bot logger only has a QueueHandler, which puts each record on an in-memory queue. A QueueListener
+# thread takes records off the queue and writes them to the console and to a log file that rotates by size
+# and by age, so a slow disk or a blocked stdout never adds latency to an interaction. Cogs log through
+# child loggers of the bot logger (bot.logger.getChild("<cog>")), so every line names the cog it came from.
+
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+LOG_FORMAT = "%(asctime)s:%(levelname)s:%(name)s: %(message)s"
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """A RotatingFileHandler that also rolls over once the current file is rotate_seconds old"""
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int, rotate_seconds: float, encoding="utf-8"):
+        super().__init__(filename, mode="a", maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.rotate_seconds = rotate_seconds
+        self.rollover_at = time.time() + rotate_seconds
+
+    def shouldRollover(self, record) -> bool:
+        if self.rotate_seconds > 0 and time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.rotate_seconds
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Drops records instead of blocking the caller when the queue is full, and counts them"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LoggingPipeline:
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 7,
+        rotate_seconds: float = 24 * 3600,
+        queue_size: int = 10000,
+        level: int = logging.DEBUG,
+    ):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.file_handler = SizeAndTimeRotatingFileHandler(path, max_bytes, backup_count, rotate_seconds)
+        self.console_handler = logging.StreamHandler(sys.stdout)
+        for handler in (self.file_handler, self.console_handler):
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        self.listener = logging.handlers.QueueListener(
+            self.queue, self.file_handler, self.console_handler, respect_handler_level=True
+        )
+        self.queue_handler = DroppingQueueHandler(self.queue)
+        self.logger = logging.getLogger(name)
+        self.logger.setLevel(level)
+        # the queue handler is the logger's only handler, the file and console are written by the listener thread
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+        self.logger.addHandler(self.queue_handler)
+        self.logger.propagate = False
+
+    def add_handler(self, handler: logging.Handler):
+        """Adds a handler that is fed by the listener thread, must be called before start"""
+        self.listener.handlers = (*self.listener.handlers, handler)
+
+    def start(self):
+        self.listener.start()
+
+    def stop(self):
+        """Writes out every queued record and stops the listener thread"""
+        self.listener.stop()
+        self.file_handler.close()
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
@@ -0,0 +1,175 @@
+# BotMetrics: Prometheus instrumentation for the bot, served on a local /metrics endpoint.
+#
+# Command latency is measured from the tree's interaction_check to command completion or error. Backend
+# latency and failures come from the circuit breakers in core/health.py, and event loop lag from a sampler
+# that measures how late a short sleep wakes up. Values that already live on other objects (cache hit
+# counters, queue depths) are registered by their owners as sources and read only when Prometheus scrapes.
+
+import asyncio
+import time
+
+import discord
+from aiohttp import web
+from discord import app_commands
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from core.health import CLOSED, HALF_OPEN, OPEN
+
+COMMAND_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+CIRCUIT_STATES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """Marks when each interaction started running so its command latency can be measured
+    Also remembers which command each running task belongs to, so the watchdog can name the command that stalled.
+    """
+
+    def __init__(self, client, **kwargs):
+        super().__init__(client, **kwargs)
+        # asyncio task -> (command name, user)
+        self.active_commands = {}
+
+    async def interaction_check(self, interaction) -> bool:
+        interaction.extras["started"] = time.perf_counter()
+        task = asyncio.current_task()
+        if task is not None:
+            command = interaction.command.qualified_name if interaction.command else "unknown"
+            if interaction.type is discord.InteractionType.autocomplete:
+                command = f"{command} (autocomplete)"
+            self.active_commands[task] = (command, str(interaction.user))
+            task.add_done_callback(self._forget_task)
+        return True
+
+    def _forget_task(self, task):
+        self.active_commands.pop(task, None)
+
+
+class SourceCollector:
+    """Reads the registered sources at scrape time"""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def collect(self):
+        for name, (kind, documentation, read) in list(self.metrics.sources.items()):
+            try:
+                value = float(read())
+            except Exception:
+                continue
+            family = CounterMetricFamily if kind == "counter" else GaugeMetricFamily
+            yield family(name, documentation, value=value)
+        breakers = self.metrics.bot.health.breakers.values()
+        state = GaugeMetricFamily(
+            "qcbot_backend_circuit_state", "Circuit breaker state, 0 closed, 1 half-open, 2 open", labels=["backend"]
+        )
+        for breaker in breakers:
+            state.add_metric([breaker.name], CIRCUIT_STATES.get(breaker.state, 0))
+        yield state
+
+
+class BotMetrics:
+    def __init__(self, bot, lag_interval: float = 0.5):
+        self.bot = bot
+        self.lag_interval = lag_interval
+        # a registry of our own, so reloading a cog never registers a metric twice in the global one
+        self.registry = CollectorRegistry()
+        self.sources = {}
+        self.command_duration = Histogram(
+            "qcbot_command_duration_seconds",
+            "Time from an app command starting to it completing",
+            ["command", "status"],
+            buckets=COMMAND_BUCKETS,
+            registry=self.registry,
+        )
+        self.command_errors = Counter(
+            "qcbot_command_errors_total", "App commands that raised", ["command", "error"], registry=self.registry
+        )
+        self.backend_duration = Histogram(
+            "qcbot_backend_call_duration_seconds",
+            "Latency of calls to Grafana, Pterodactyl and RCON",
+            ["backend", "outcome"],
+            buckets=COMMAND_BUCKETS,
+            registry=self.registry,
+        )
+        self.backend_rejected = Counter(
+            "qcbot_backend_calls_rejected_total",
+            "Calls failed fast because the backend's circuit breaker was open",
+            ["backend"],
+            registry=self.registry,
+        )
+        self.loop_lag = Histogram(
+            "qcbot_event_loop_lag_seconds",
+            "How late the event loop ran a sleep that should have woken on time",
+            buckets=LAG_BUCKETS,
+            registry=self.registry,
+        )
+        self.loop_lag_last = Gauge(
+            "qcbot_event_loop_lag_last_seconds", "The most recent event loop lag sample", registry=self.registry
+        )
+        self.registry.register(SourceCollector(self))
+        self._runner = None
+        self._lag_task = None
+
+    def source(self, name: str, documentation: str, read, kind: str = "gauge"):
+        """Registers a value read at scrape time, e.g. a cache hit counter or a queue length
+        :param name: The metric name, counters should end in _total
+        :param documentation: The help text
+        :param read: A callable returning the current value
+        :param kind: 'gauge' or 'counter'
+        """
+        self.sources[name] = (kind, documentation, read)
+
+    def remove_sources(self, prefix: str):
+        """Drops every source whose name starts with prefix, used when a cog unloads"""
+        for name in [name for name in self.sources if name.startswith(prefix)]:
+            del self.sources[name]
+
+    def observe_backend(self, backend: str, outcome: str, latency: float):
+        """Health registry observer, called after every backend call"""
+        if outcome == "rejected":
+            self.backend_rejected.labels(backend).inc()
+        else:
+            self.backend_duration.labels(backend, outcome).observe(latency)
+
+    def observe_command(self, interaction, error: Exception = None):
+        started = interaction.extras.get("started")
+        command = interaction.command.qualified_name if interaction.command else "unknown"
+        if error is not None:
+            self.command_errors.labels(command, type(error).__name__).inc()
+        if started is not None:
+            status = "error" if error is not None else "ok"
+            self.command_duration.labels(command, status).observe(time.perf_counter() - started)
+
+    async def _sample_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            lag = max(loop.time() - expected, 0)
+            self.loop_lag.observe(lag)
+            self.loop_lag_last.set(lag)
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        body = generate_latest(self.registry)
+        return web.Response(body=body, headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+    async def start(self, host: str = None, port: int = None):
+        """Starts the lag sampler, and the /metrics endpoint when a port is given"""
+        self._lag_task = asyncio.create_task(self._sample_lag())
+        if port is None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        self.bot.logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+
+    async def stop(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
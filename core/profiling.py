@@ -0,0 +1,99 @@
+# Profiling: on-demand CPU and memory profiling of the running bot, for /admin profile and /admin memsnapshot.
+#
+# Nothing runs until an admin asks for it. The CPU profiler is a thread that samples every thread's stack with
+# sys._current_frames() for a fixed number of seconds and counts identical stacks, written out in the collapsed
+# format flamegraph.pl and speedscope read. tracemalloc is only started by the first memory snapshot, since
+# tracing slows every allocation, and each later snapshot is diffed against the one before it.
+
+import asyncio
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from io import BytesIO
+
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    def _sample(self, seconds: float) -> tuple:
+        stacks = Counter()
+        samples = 0
+        own_thread = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                stacks[";".join(reversed(stack))] += 1
+            samples += 1
+            time.sleep(self.interval)
+        return stacks, samples
+
+    async def profile(self, seconds: float) -> tuple:
+        """Samples every thread for the given time on a worker thread
+        :param seconds: How long to sample for
+        :return: A tuple of (collapsed stacks as a BytesIO, samples taken)
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running, wait for it to finish.")
+        try:
+            stacks, samples = await asyncio.to_thread(self._sample, seconds)
+        finally:
+            self._lock.release()
+        collapsed = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        return BytesIO(collapsed.encode("utf-8")), samples
+
+
+class MemorySnapshots:
+    def __init__(self, frames: int = 1):
+        self.frames = frames
+        self.previous = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def snapshot(self, top: int = 10):
+        """Starts tracing on the first call, afterwards diffs a new snapshot against the previous one
+        :param top: How many allocation sites to return
+        :return: None when tracing was only just started, else a list of tracemalloc.StatisticDiff by size change
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.previous = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+            return None
+        current = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        diff = current.compare_to(self.previous, "lineno")
+        self.previous = current
+        return diff[:top]
+
+    def stop(self):
+        """Stops tracing and frees the previous snapshot"""
+        self.previous = None
+        tracemalloc.stop()
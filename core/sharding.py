@@ -0,0 +1,44 @@
+# Sharding: splits the bot's gateway shards over several processes on one host.
+#
+# SHARD_COUNT makes the bot an AutoShardedBot, and SHARD_IDS picks the shards one process runs, e.g. "0-3" or
+# "0,2". With SHARD_PROCESSES the launcher in main.py starts that many processes itself, each with a
+# contiguous range of shard IDs, its own log file and its own metrics port. When the processes run on several
+# hosts SHARD_PROCESSES is still set to their total, so they split the Pterodactyl rate limit between them.
+# The primary process, the one running shard 0 unless PRIMARY_PROCESS says otherwise, is the only one that
+# runs work which must happen once per bot: the report scheduler, the alert webhook, idle policies, panel
+# polling, command sync and snapshot writes. The other processes follow the primary's snapshots, and the
+# report and idle policy files are shared through core/file_lock.py.
+
+
+def parse_shard_ids(text: str) -> list:
+    """Parses shard IDs written as ranges and single IDs, e.g. "0-3,6" -> [0, 1, 2, 3, 6]"""
+    shard_ids = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            shard_ids.extend(range(int(first), int(last) + 1))
+        else:
+            shard_ids.append(int(part))
+    return sorted(set(shard_ids))
+
+
+def split_shards(shard_count: int, processes: int) -> list:
+    """Splits range(shard_count) into at most processes contiguous, nearly equal ranges"""
+    processes = max(min(processes, shard_count), 1)
+    size, extra = divmod(shard_count, processes)
+    ranges, start = [], 0
+    for index in range(processes):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def is_primary(shard_ids: list, override: str = None) -> bool:
+    """The process running shard 0 is the primary, or every process when the bot isn't split"""
+    if override:
+        return override.lower() == "true"
+    return not shard_ids or 0 in shard_ids
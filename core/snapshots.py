@@ -0,0 +1,143 @@
+# SnapshotStore: writes in-memory caches and indexes to disk so a restarted bot starts warm.
+#
+# Each cog registers named sections with a dump function returning json-compatible data and a load function
+# that puts it back. Sections are saved as gzip compressed json, one file per section, periodically, when
+# the owning cog unloads and when the bot shuts down. On registration the last saved file is loaded, unless
+# it was written by a different section version or is older than the section's staleness limit, in which
+# case the cache simply starts cold and is rebuilt from the backend as before.
+
+import asyncio
+import gzip
+import json
+import os
+import time
+
+# bump when the file envelope itself changes, sections carry their own version
+SNAPSHOT_FORMAT = 1
+
+
+class SnapshotSection:
+    def __init__(self, name: str, version: int, dump, load, max_age: float):
+        self.name = name
+        self.version = version
+        self.dump = dump
+        self.load = load
+        self.max_age = max_age
+
+
+class SnapshotStore:
+    def __init__(self, directory: str, logger, max_age: float = 3600, writable: bool = True):
+        self.directory = directory
+        self.logger = logger
+        self.max_age = max_age
+        # False in the secondary processes of a sharded bot, which share the primary's snapshot files
+        self.writable = writable
+        self.sections = {}
+        self._task = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json.gz")
+
+    def register(self, name: str, version: int, dump, load, max_age: float = None, restore: bool = True) -> bool:
+        """Registers a section and restores it from its last snapshot
+        :param name: The file name of the section, prefixed with the cog, e.g. pterodactyl_inventory
+        :param version: Bumped whenever the dumped structure changes, older snapshots are then ignored
+        :param dump: Returns the section's current state as json-compatible data
+        :param load: Takes (data, saved_at unix time) and restores the state
+        :param max_age: Seconds after which a snapshot is too stale to restore, defaults to the store's limit
+        :param restore: False when the state is already warm, e.g. handed off by a reloaded cog
+        :return: Whether a snapshot was restored
+        """
+        section = SnapshotSection(name, version, dump, load, self.max_age if max_age is None else max_age)
+        self.sections[name] = section
+        return self.restore(section) if restore else False
+
+    def _read(self, section: SnapshotSection):
+        """The section's last snapshot, or None when there is none it can be restored from"""
+        try:
+            with gzip.open(self._path(section.name), "rt", encoding="utf-8") as file:
+                snapshot = json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable snapshot {section.name}: {e}")
+            return None
+        if snapshot.get("format") != SNAPSHOT_FORMAT or snapshot.get("version") != section.version:
+            self.logger.info(f"Ignoring snapshot {section.name}, it was written by a different version")
+            return None
+        age = time.time() - snapshot.get("saved_at", 0)
+        if age > section.max_age:
+            self.logger.info(f"Ignoring snapshot {section.name}, it is {int(age)}s old")
+            return None
+        return snapshot
+
+    def _load(self, section: SnapshotSection, snapshot: dict) -> bool:
+        try:
+            section.load(snapshot["data"], snapshot["saved_at"])
+        except Exception as e:
+            self.logger.warning(f"Could not restore snapshot {section.name}: {e}")
+            return False
+        self.logger.info(f"Restored snapshot {section.name} from {int(time.time() - snapshot['saved_at'])}s ago")
+        return True
+
+    def restore(self, section: SnapshotSection) -> bool:
+        snapshot = self._read(section)
+        return snapshot is not None and self._load(section, snapshot)
+
+    async def reload(self, prefix: str = ""):
+        """Restores every section whose name starts with prefix from its file again
+        The secondary processes of a sharded bot follow the state the primary saves this way, instead of
+        asking the backends themselves. The files are read on a worker thread, the state is loaded on the loop.
+        """
+        for section in [section for name, section in self.sections.items() if name.startswith(prefix)]:
+            snapshot = await asyncio.to_thread(self._read, section)
+            if snapshot is not None:
+                self._load(section, snapshot)
+
+    def _write(self, name: str, snapshot: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(name)
+        temp_path = f"{path}.tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as file:
+            json.dump(snapshot, file, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    async def save(self, prefix: str = "", forget: bool = False):
+        """Saves every section whose name starts with prefix
+        The state is dumped on the event loop, compression and the file write happen on a worker thread.
+        :param prefix: e.g. "grafana_", everything when empty
+        :param forget: Unregister the sections afterwards, used when their cog unloads
+        """
+        for section in [section for name, section in self.sections.items() if name.startswith(prefix)]:
+            if not self.writable:
+                if forget:
+                    self.sections.pop(section.name, None)
+                continue
+            try:
+                snapshot = {
+                    "format": SNAPSHOT_FORMAT,
+                    "version": section.version,
+                    "saved_at": time.time(),
+                    "data": section.dump(),
+                }
+                await asyncio.to_thread(self._write, section.name, snapshot)
+            except Exception as e:
+                self.logger.warning(f"Could not save snapshot {section.name}: {e}")
+            if forget:
+                self.sections.pop(section.name, None)
+
+    async def _save_periodically(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.save()
+
+    def start(self, interval: float):
+        """Saves every section every interval seconds"""
+        if interval > 0:
+            self._task = asyncio.create_task(self._save_periodically(interval))
+
+    async def stop(self):
+        """Stops the periodic save and saves whatever is still registered"""
+        if self._task is not None:
+            self._task.cancel()
+        await self.save()
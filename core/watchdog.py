@@ -0,0 +1,130 @@
+# LoopWatchdog: detects callbacks that block the event loop and names the command responsible.
+#
+# A coroutine on the loop refreshes a heartbeat a few times per threshold. A separate thread checks the
+# heartbeat, and when it falls more than threshold behind the loop is stuck in one callback: the thread then
+# captures the loop thread's stack and the command whose task is running. Once the loop recovers the stall is
+# logged, counted per command and queued for a periodic summary in the admin channel.
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+
+import discord
+
+
+class Stall:
+    def __init__(self, command: str, user: str, stack: str):
+        self.command = command
+        self.user = user
+        self.stack = stack
+        self.at = time.time()
+        self.duration = 0.0
+
+
+class LoopWatchdog:
+    def __init__(self, bot, logger, threshold: float = 0.25, channel_id: int = None, report_seconds: float = 60):
+        self.bot = bot
+        self.logger = logger
+        self.threshold = threshold
+        self.channel_id = channel_id
+        self.report_seconds = report_seconds
+        self.heartbeat = time.monotonic()
+        self.counts = Counter()
+        self.seconds = Counter()
+        self.recent = deque(maxlen=20)
+        self._pending = []
+        self._stopped = threading.Event()
+        self._tasks = []
+        self._thread = None
+        self.loop = None
+        self.loop_thread_id = None
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def start(self):
+        """Starts the heartbeat and the watchdog thread, must be called from the event loop"""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self._tasks = [asyncio.create_task(self._beat())]
+        if self.channel_id:
+            self._tasks.append(asyncio.create_task(self._report_periodically()))
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        for task in self._tasks:
+            task.cancel()
+
+    async def _beat(self):
+        while True:
+            self.heartbeat = time.monotonic()
+            await asyncio.sleep(self.threshold / 4)
+
+    def _capture(self) -> Stall:
+        """Runs on the watchdog thread while the loop is blocked"""
+        frame = sys._current_frames().get(self.loop_thread_id)
+        stack = "".join(traceback.format_stack(frame, limit=15)) if frame is not None else "unavailable"
+        # the task the loop is stuck in, read without touching the blocked loop
+        task = asyncio.current_task(self.loop)
+        command, user = getattr(self.bot.tree, "active_commands", {}).get(task, ("no command", "-"))
+        return Stall(command, user, stack)
+
+    def _watch(self):
+        stall, stalled_since = None, None
+        while not self._stopped.wait(self.threshold / 4):
+            behind = time.monotonic() - self.heartbeat
+            if stall is None and behind > self.threshold:
+                stall, stalled_since = self._capture(), self.heartbeat
+            elif stall is not None and self.heartbeat != stalled_since:
+                stall.duration = self.heartbeat - stalled_since
+                self.loop.call_soon_threadsafe(self._record, stall)
+                stall = None
+
+    def _record(self, stall: Stall):
+        self.counts[stall.command] += 1
+        self.seconds[stall.command] += stall.duration
+        self.recent.append(stall)
+        self.logger.warning(
+            f"Event loop blocked for {stall.duration:.2f}s in {stall.command} (user {stall.user}), stack:\n{stall.stack}"
+        )
+        if self.channel_id:
+            self._pending.append(stall)
+
+    async def _report_periodically(self):
+        while True:
+            await asyncio.sleep(self.report_seconds)
+            if not self._pending:
+                continue
+            stalls, self._pending = self._pending, []
+            try:
+                channel = self.bot.get_channel(self.channel_id) or await self.bot.fetch_channel(self.channel_id)
+                await channel.send(embed=self.summary_embed(stalls))
+            except discord.HTTPException as e:
+                self.logger.error(f"Could not post the event loop stall report: {e}")
+
+    def summary_embed(self, stalls: list = None) -> discord.Embed:
+        """Stall counts per command since startup, with the worst of the given stalls and its stack"""
+        embed = discord.Embed(title="Event loop stalls", color=discord.Color.orange())
+        if stalls:
+            embed.description = f"{len(stalls)} new stalls above {self.threshold * 1000:.0f} ms"
+        for command, count in self.counts.most_common(10):
+            embed.add_field(
+                name=command[:256],
+                value=f"{count} stalls, {self.seconds[command]:.2f}s blocked",
+                inline=True,
+            )
+        worst = max(stalls or self.recent, key=lambda stall: stall.duration, default=None)
+        if worst is not None:
+            embed.add_field(
+                name=f"Longest: {worst.duration:.2f}s in {worst.command}"[:256],
+                value=f"```{worst.stack[-1000:]}```",
+                inline=False,
+            )
+        return embed
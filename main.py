@@ -4,104 +4,285 @@ from discord import app_commands
 from dotenv import load_dotenv
 import asyncio
 import logging
+import multiprocessing
 from discord.ext import commands
 from discord import File
 import os
 import io
-
-intents = discord.Intents.default()
-intents.message_content = True
-intents.messages = True
-intents.guilds = True
-intents.reactions = True
-intents.members = True
+import time
+import tracemalloc
+from typing import Literal
+from core.authorization import DEFAULT_PRIVILEGED_ROLES, Authorization, NotPrivileged, privileged
+from core.cog_loader import discover_extensions, import_extensions, load_extensions
+from core.command_sync import CommandSync
+from core.gateway import enabled_intents, gateway_intents, missing_intents
+from core.handoff import HandoffRegistry
+from core.health import BackendError, BackendUnavailable, HealthRegistry
+from core.jobs import JobQueue
+from core.log_buffer import LogBufferHandler, build_log_pages, export_gzip
+from core.logging_pipeline import LoggingPipeline
+from core.metrics import BotMetrics, InstrumentedCommandTree
+from core.profiling import MemorySnapshots, ProfilerBusy, SamplingProfiler
+from core.sharding import is_primary, parse_shard_ids, split_shards
+from core.snapshots import SnapshotStore
+from core.watchdog import LoopWatchdog
 
 load_dotenv()
 
+
+class LogPageView(discord.ui.View):
+    """Previous/next buttons over the pages of a /admin logbuffer query, starting on the newest page"""
+
+    def __init__(self, pages: list, timeout: float = 300):
+        super().__init__(timeout=timeout)
+        self.pages = pages
+        self.page = len(pages) - 1
+        self._refresh_buttons()
+
+    def content(self) -> str:
+        return f"```{self.pages[self.page]}```Page {self.page + 1}/{len(self.pages)}"
+
+    def _refresh_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= len(self.pages) - 1
+
+    async def _show_page(self, interaction: discord.Interaction, page: int):
+        self.page = page
+        self._refresh_buttons()
+        await interaction.response.edit_message(content=self.content(), view=self)
+
+    @discord.ui.button(label="Older", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show_page(interaction, max(self.page - 1, 0))
+
+    @discord.ui.button(label="Newer", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show_page(interaction, min(self.page + 1, len(self.pages) - 1))
+
+
 class QCAdmin(commands.Cog):
     def __init__(self, bot):
         """Initializes the QCAdmin class with necessary setup for admin commands and cog management."""
         self.bot = bot
         self.logger = self.setup_logger()
-        print("QCAdmin initialized")
+        # idle until an admin runs /admin profile or /admin memsnapshot
+        self.profiler = SamplingProfiler()
+        self.memory_snapshots = MemorySnapshots(frames=int(os.getenv("TRACEMALLOC_FRAMES", "1")))
+        dev_guild_id = os.getenv("DEV_GUILD_ID")
+        self.command_sync = CommandSync(
+            bot,
+            self.logger,
+            os.getenv("COMMAND_SYNC_STATE", "command_sync_state.json"),
+            dev_guild_id=int(dev_guild_id) if dev_guild_id else None,
+        )
+        self.startup_synced = False
+        # filled by main() with a CogLoadResult per extension loaded at startup
+        self.cog_load_results = []
         self.logger.info("QCAdmin initialized")
 
     def setup_logger(self):
-        """Sets up logging for the bot."""
-        logger = logging.getLogger("quantumly_confused_bot_log")
-        logger.setLevel(logging.DEBUG)
-        handler = logging.FileHandler("quantumly_confused_bot.log", encoding="utf-8", mode="a")
-        console_handler = logging.StreamHandler(sys.stdout)
-        handler.setFormatter(logging.Formatter("%(asctime)s:%(levelname)s:%(name)s: %(message)s"))
-        console_handler.setFormatter(logging.Formatter("%(asctime)s:%(levelname)s:%(name)s: %(message)s"))
-        logger.addHandler(handler)
-        logger.addHandler(console_handler)
-        print(f"Log file created at: {handler.baseFilename}")
+        """Sets up logging for the bot.
+        Records are queued and written to the console and a rotating log file by a background thread,
+        cogs log through child loggers of this one, e.g. quantumly_confused_bot_log.quantum_pterodactyl
+        """
+        self.log_pipeline = LoggingPipeline(
+            "quantumly_confused_bot_log",
+            os.getenv("LOG_FILE", "quantumly_confused_bot.log"),
+            max_bytes=int(float(os.getenv("LOG_MAX_MB", "10")) * 1024 * 1024),
+            backup_count=int(os.getenv("LOG_BACKUP_COUNT", "7")),
+            rotate_seconds=float(os.getenv("LOG_ROTATE_HOURS", "24")) * 3600,
+        )
+        # the most recent records, kept in memory for /admin logbuffer
+        self.log_buffer = LogBufferHandler(
+            "quantumly_confused_bot_log", capacity=int(os.getenv("LOG_BUFFER_CAPACITY", "5000"))
+        )
+        self.log_pipeline.add_handler(self.log_buffer)
+        self.log_pipeline.start()
+        logger = self.log_pipeline.logger
+        logger.info(f"Log file created at: {self.log_pipeline.file_handler.baseFilename}")
         return logger
     
-    def add_logger_memory_handler(self):
-        """Adds a memory handler to capture buffered log data."""
-        # hold logs in memory and buffer up to 100 log records
-        memory_handler = logging.handlers.MemoryHandler(capacity=100, target=None)
-        memory_handler.setFormatter(logging.Formatter("%(asctime)s:%(levelname)s:%(name)s: %(message)s"))
-        self.logger.addHandler(memory_handler)
-        self.memory_handler = memory_handler
+    async def on_app_command_error(self, Interaction: discord.Interaction, error: app_commands.AppCommandError):
+        """Tree wide error handler
+        Answers commands refused by the privileged check or that hit a backend whose circuit breaker is open, and
+        every other failed command, so a deferred command never stays "thinking" until its token expires.
+        """
+        original = getattr(error, "original", error)
+        self.bot.metrics.observe_command(Interaction, original)
+        command_name = Interaction.command.qualified_name if Interaction.command else "unknown"
+        if isinstance(original, (BackendUnavailable, NotPrivileged)):
+            message = f"⛔ {original}"
+        elif isinstance(original, BackendError):
+            message = f"❌ {original}"
+            self.logger.warning(f"Backend error in command {command_name}: {original}")
+        else:
+            self.logger.error(f"Error in command {command_name}: {error}", exc_info=original)
+            message = "❌ Something went wrong running this command, the error has been logged."
+        try:
+            if Interaction.response.is_done():
+                await Interaction.followup.send(message, ephemeral=True)
+            else:
+                await Interaction.response.send_message(message, ephemeral=True)
+        except discord.HTTPException as e:
+            self.logger.warning(f"Could not report a command error to {Interaction.user}: {e}")
 
     @commands.Cog.listener()
-    async def on_ready(self):
-        """Event handler for when the bot is ready."""
-        print(f"Logged in as {self.bot.user.name}")
-        print(f"Discord.py API version: {discord.__version__}")
-        print(f"Bot ID: {self.bot.user.id}")
-        self.logger.info(f"Logged in as {self.bot.user.name} Discord.py API version: {discord.__version__} Bot ID: {self.bot.user.id}")
-
-    def is_mod_or_admin():
-        async def predicate(ctx):
-            mod_role = discord.utils.get(ctx.guild.roles, name="Moderation Team")
-            owner_role = discord.utils.get(ctx.guild.roles, name="Owner")
-            admin_role = discord.utils.get(ctx.guild.roles, name="Admin")
-            return mod_role in ctx.author.roles or admin_role in ctx.author.roles or owner_role in ctx.author.roles
-        return commands.check(predicate)
+    async def on_app_command_completion(self, Interaction: discord.Interaction, command):
+        self.bot.metrics.observe_command(Interaction)
 
     # Admin command group
     admin = app_commands.Group(name="admin", description="Admin commands for the bot.")
     
     @admin.command(name="sync", description="Syncs the bot's commands with Discord.")
-    @is_mod_or_admin()
-    async def sync_commands(self, Interaction: discord.Interaction):
-        """ Syncs the bot's commands with Discord API."""
+    @privileged()
+    async def sync_commands(self, Interaction: discord.Interaction, force: bool = False):
+        """ Syncs the bot's commands with Discord API, unless they are unchanged since the last sync or forced."""
         await Interaction.response.defer()
         try:
             self.logger.info(f"Command sync initiated by {Interaction.user}...")
-            synced = await self.bot.tree.sync()
-            await Interaction.followup.send(f"Commands synced successfully! Synced {len(synced)} commands.")
-            self.logger.info(f"Synced {len(synced)} commands.")
+            result = await self.command_sync.sync(force=force)
+            if result.skipped:
+                await Interaction.followup.send(
+                    f"Commands are unchanged since the last {result.scope} sync, nothing to do. Use force to sync anyway."
+                )
+                return
+            await Interaction.followup.send(
+                f"Commands synced successfully! Synced {result.synced} commands to {result.scope}."
+            )
         except Exception as e:
             self.logger.error(f"Sync failed: {e}")
             await Interaction.followup.send(f"Sync failed: {e}")
             
-    @admin.command(name="logbuffer", description="Command to capture logs from the log memory buffer.")
-    async def memory_logbuffer(self, ctx):
-        """Command to capture logs from the log memory buffer."""
-        # Flush memory handler to the buffer 
-        self.memory_handler.flush()  
+    @admin.command(name="health", description="Shows the status and latency of the bot's backends.")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def backend_health(self, Interaction: discord.Interaction):
+        """Shows the circuit breaker state, latency and recent errors of every backend"""
+        icons = {"closed": "🟢", "half-open": "🟡", "open": "🔴"}
+        embed = discord.Embed(title="Backend Health", color=discord.Color.blurple())
+        for breaker in self.bot.health.breakers.values():
+            latency = "n/a"
+            if breaker.last_latency is not None:
+                latency = f"{breaker.last_latency * 1000:.0f} ms (avg {breaker.average_latency * 1000:.0f} ms)"
+            lines = [
+                f"State: {breaker.state}" + (f", retry in {int(breaker.retry_in)}s" if breaker.state == "open" else ""),
+                f"Latency: {latency}",
+                f"Calls: {breaker.calls}, rejected: {breaker.rejected}, failures in a row: {breaker.failures}",
+            ]
+            if breaker.last_error:
+                lines.append(f"Last error <t:{int(breaker.last_failure_at)}:R>: {breaker.last_error}")
+            embed.add_field(
+                name=f"{icons.get(breaker.state, '⚪')} {breaker.name}", value="\n".join(lines)[:1024], inline=False
+            )
+        if not self.bot.health.breakers:
+            embed.description = "No backends registered, load a cog that uses one."
+        await Interaction.response.send_message(embed=embed)
+
+    @admin.command(name="stalls", description="Shows which commands have blocked the bot's event loop.")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def loop_stalls(self, Interaction: discord.Interaction):
+        """Shows the event loop watchdog's stall counts per command and the longest recent stall"""
+        watchdog = getattr(self.bot, "watchdog", None)
+        if watchdog is None:
+            await Interaction.response.send_message("The event loop watchdog is disabled.", ephemeral=True)
+            return
+        embed = watchdog.summary_embed()
+        if not watchdog.total:
+            embed.description = f"No stalls above {watchdog.threshold * 1000:.0f} ms since startup."
+        await Interaction.response.send_message(embed=embed, ephemeral=True)
 
-        # Gather all log records from the buffer
-        log_records = [self.memory_handler.format(record) for record in self.memory_handler.buffer]
+    async def log_cog_autocomplete(self, Interaction: discord.Interaction, current: str):
+        return [
+            app_commands.Choice(name=cog, value=cog)
+            for cog in self.log_buffer.cogs()
+            if current.lower() in cog.lower()
+        ][:25]
 
-        if not log_records:
-            await ctx.send("No recent log entries found.")
+    @admin.command(name="logbuffer", description="Shows recent log records from the in-memory log buffer.")
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.autocomplete(cog=log_cog_autocomplete)
+    async def memory_logbuffer(
+        self,
+        Interaction: discord.Interaction,
+        level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = "INFO",
+        cog: str = None,
+        minutes: app_commands.Range[int, 1, 10080] = None,
+        contains: str = None,
+        export: bool = False,
+    ):
+        """Shows recent log records, filtered by minimum level, cog, time window and text
+        Reading leaves the buffer untouched. With export set the matching records are attached as a gzip file.
+        """
+        entries = self.log_buffer.query(logging.getLevelName(level), cog, minutes, contains)
+        if not entries:
+            await Interaction.response.send_message("No matching log entries found.", ephemeral=True)
             return
 
-        # Combine log records but keep it under Discord's 2000 character limit
-        log_data = "\n".join(log_records)
-        if len(log_data) > 1900:
-            log_data = log_data[-1900:]  # Trim to the last 1900 characters
+        if export:
+            await Interaction.response.send_message(
+                f"{len(entries)} log entries.",
+                file=File(export_gzip(entries), filename="quantumly_confused_bot_logs.txt.gz"),
+                ephemeral=True,
+            )
+            return
 
-        await ctx.send(f"```{log_data}```")
+        view = LogPageView(build_log_pages(entries))
+        await Interaction.response.send_message(view.content(), view=view, ephemeral=True)
 
-        # Clear method to clear the buffer
-        self.memory_handler.buffer.clear()
+    @admin.command(name="profile", description="Samples the bot's stacks and returns a flamegraph file.")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def cpu_profile(self, Interaction: discord.Interaction, seconds: app_commands.Range[int, 1, 120] = 10):
+        """Samples every thread's stack for the given time and attaches them as collapsed stacks
+        The file can be opened in speedscope or turned into a flamegraph with flamegraph.pl.
+        """
+        await Interaction.response.defer(ephemeral=True)
+        self.logger.info(f"CPU profile of {seconds}s started by {Interaction.user}")
+        try:
+            collapsed, samples = await self.profiler.profile(seconds)
+        except ProfilerBusy as e:
+            await Interaction.followup.send(str(e), ephemeral=True)
+            return
+        await Interaction.followup.send(
+            f"{samples} samples over {seconds}s.",
+            file=File(collapsed, filename=f"qcbot_profile_{int(time.time())}.folded"),
+            ephemeral=True,
+        )
+
+    @admin.command(name="memsnapshot", description="Shows where memory grew since the previous snapshot.")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def memory_snapshot(
+        self, Interaction: discord.Interaction, top: app_commands.Range[int, 1, 25] = 10, stop: bool = False
+    ):
+        """Diffs a tracemalloc snapshot against the previous one and lists the top allocation sites
+        The first call only starts tracing, stop turns tracing off again so allocations are not slowed down.
+        """
+        if stop:
+            if self.memory_snapshots.tracing:
+                self.memory_snapshots.stop()
+                self.logger.info(f"tracemalloc stopped by {Interaction.user}")
+            await Interaction.response.send_message("Memory tracing stopped.", ephemeral=True)
+            return
+
+        await Interaction.response.defer(ephemeral=True)
+        # taking a snapshot walks every traced allocation, keep that off the event loop
+        stats = await asyncio.to_thread(self.memory_snapshots.snapshot, top)
+        if stats is None:
+            self.logger.info(f"tracemalloc started by {Interaction.user}")
+            await Interaction.followup.send(
+                "Memory tracing started, run this again later to see what grew since now.", ephemeral=True
+            )
+            return
+
+        lines = []
+        for stat in stats:
+            frame = stat.traceback[0]
+            lines.append(
+                f"{stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+d} blocks), {stat.size / 1024:.1f} KiB total"
+                f"\n  {frame.filename}:{frame.lineno}"
+            )
+        traced, peak = tracemalloc.get_traced_memory()
+        header = f"Traced: {traced / 1024 / 1024:.1f} MiB, peak {peak / 1024 / 1024:.1f} MiB\n"
+        body = "\n".join(lines) if lines else "No allocation sites changed."
+        await Interaction.followup.send(f"{header}```{body[:1850]}```", ephemeral=True)
 
     # Cog command group
     cog = app_commands.Group(name="cog", description="Manage bot cogs.")
@@ -112,7 +293,16 @@ class QCAdmin(commands.Cog):
         try:
             await self.bot.load_extension(cog_name)
             self.logger.info(f"Loaded {cog_name}")
-            await Interaction.followup.send(f"Loaded {cog_name}")
+            message = f"Loaded {cog_name}"
+            # intents are fixed when the bot connects, a cog loaded later may need ones it doesn't have
+            missing = missing_intents(self.bot.extensions.get(cog_name), self.bot.intents)
+            if missing:
+                self.logger.warning(f"{cog_name} needs intents the bot connected without: {', '.join(missing)}")
+                message += (
+                    f"\n⚠️ It needs intents the bot connected without ({', '.join(missing)}),"
+                    " restart the bot to enable them."
+                )
+            await Interaction.followup.send(message)
         except Exception as e:
             self.logger.error(f"Failed to load {cog_name}: {e}")
             await Interaction.followup.send(f"Failed to load {cog_name}: {e}")
@@ -132,9 +322,9 @@ class QCAdmin(commands.Cog):
     async def reload_cog(self, Interaction: discord.Interaction, cog_name: str):
         await Interaction.response.defer()
         try:
-            await self.bot.reload_extension(cog_name)
-            self.logger.info(f"Reloaded {cog_name}")
-            await Interaction.followup.send(f"Reloaded {cog_name}")
+            # the old instance hands its sessions, caches and trackers to the new one, see core/handoff.py
+            report = await self.bot.handoff.reload(self.bot, cog_name)
+            await Interaction.followup.send(f"```{report.format()[:1900]}```")
         except Exception as e:
             self.logger.error(f"Failed to reload {cog_name}: {e}")
             await Interaction.followup.send(f"Failed to reload {cog_name}: {e}")
@@ -142,29 +332,169 @@ class QCAdmin(commands.Cog):
     @cog.command(name="loaded", description="Shows currently loaded extensions.")
     async def show_loaded_extensions(self, Interaction: discord.Interaction):
         loaded_extensions = list(self.bot.extensions)
-        await Interaction.response.send_message(f"Currently loaded extensions: {loaded_extensions}")
+        message = f"Currently loaded extensions: {loaded_extensions}"
+        if self.cog_load_results:
+            timings = "\n".join(result.format() for result in self.cog_load_results)
+            message += f"\nStartup load times:\n```{timings[:1800]}```"
+        await Interaction.response.send_message(message)
         self.logger.info("Displayed loaded extensions")
         
-    async def sync_commands(self):
-        """Syncs the bot's commands with Discord on startup."""
-        print("Bot Startup Command Sync initiated...")
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Event handler for when the bot is ready.
+        Syncs the bot's commands with Discord on startup, if they changed since the last sync. on_ready fires
+        again after reconnects, only the first one syncs, and only in the primary process of a sharded bot.
+        """
+        self.logger.info(f"Logged in as {self.bot.user.name} Discord.py API version: {discord.__version__} Bot ID: {self.bot.user.id}")
+        if self.startup_synced or not self.bot.primary:
+            return
+        self.startup_synced = True
         self.logger.info("Bot Startup Command Sync initiated...")
         try:
-            synced = await self.bot.tree.sync()
-            print(f"Command Sync Completed: Synced {len(synced)} commands.")
-            self.logger.info(f"Command Sync Completed: Synced {len(synced)} commands.")
+            await self.command_sync.sync()
         except Exception as e:
-            print(e)
             self.logger.error(f"Error syncing commands: {e}")
 
 # Bot initialization and startup
 async def main():
-    bot = commands.Bot(command_prefix="/", intents=intents)
+    disabled = {name.strip() for name in os.getenv("DISABLED_COGS", "").split(",") if name.strip()}
+    cogs_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cogs")
+    # the cogs are imported before the bot exists, it connects with the intents they declare
+    imported = await import_extensions(discover_extensions(cogs_directory, disabled))
+    extra_intents = [name.strip() for name in os.getenv("GATEWAY_EXTRA_INTENTS", "").split(",") if name.strip()]
+    max_messages = int(os.getenv("GATEWAY_MAX_MESSAGES", "0"))
+    # sharding is opt-in, see core/sharding.py
+    shard_count = os.getenv("SHARD_COUNT")
+    shard_ids = parse_shard_ids(os.getenv("SHARD_IDS", ""))
+    if shard_ids and not shard_count:
+        raise ValueError("SHARD_IDS needs SHARD_COUNT to be set")
+    sharding = {"shard_count": int(shard_count), "shard_ids": shard_ids or None} if shard_count else {}
+    bot_cls = commands.AutoShardedBot if shard_count else commands.Bot
+    bot = bot_cls(
+        command_prefix="/",
+        intents=gateway_intents([module for module, seconds in imported.values()], extra_intents),
+        # interactions carry the invoking member, nothing needs the member list or past messages
+        member_cache_flags=discord.MemberCacheFlags.none(),
+        max_messages=max_messages or None,
+        chunk_guilds_at_startup=False,
+        tree_cls=InstrumentedCommandTree,
+        **sharding,
+    )
+    # work that must run once per bot only runs in the primary process
+    bot.primary = is_primary(shard_ids, os.getenv("PRIMARY_PROCESS"))
+    # how many processes share the bot's backends, e.g. the Pterodactyl rate limit
+    bot.process_count = max(int(os.getenv("SHARD_PROCESSES", "1")), 1)
     qc_admin = QCAdmin(bot)
     bot.logger = qc_admin.logger
-    await bot.add_cog(qc_admin)
-    await bot.start(os.getenv('DISCORD_API_TOKEN'))
-    await qc_admin.sync_commands()
+    bot.logger.info(f"Connecting with intents: {', '.join(enabled_intents(bot.intents))}")
+    if shard_count:
+        bot.logger.info(
+            f"Running shards {shard_ids or 'all'} of {shard_count}" + (" as the primary process" if bot.primary else "")
+        )
+    # shared by every cog, one circuit breaker per backend
+    bot.health = HealthRegistry(
+        failure_threshold=int(os.getenv("HEALTH_FAILURE_THRESHOLD", "5")),
+        reset_seconds=float(os.getenv("HEALTH_RESET_SECONDS", "30")),
+    )
+    bot.tree.error(qc_admin.on_app_command_error)
+    privileged_roles = os.getenv("PRIVILEGED_ROLES")
+    bot.authorization = Authorization(
+        bot,
+        [name.strip() for name in privileged_roles.split(",") if name.strip()]
+        if privileged_roles
+        else DEFAULT_PRIVILEGED_ROLES,
+    )
+    bot.handoff = HandoffRegistry(bot.logger)
+    # cogs register their caches here in __init__, which also restores the last snapshot
+    bot.snapshots = SnapshotStore(
+        os.getenv("SNAPSHOT_DIR", "snapshots"),
+        bot.logger.getChild("snapshots"),
+        max_age=float(os.getenv("SNAPSHOT_MAX_AGE_MINUTES", "60")) * 60,
+        # every process restores the snapshots, one writes them
+        writable=bot.primary,
+    )
+    # CPU-bound work (image hashing) runs here instead of on the event loop
+    bot.jobs = JobQueue(int(os.getenv("JOB_WORKERS", "0")), bot.logger.getChild("jobs"))
+    bot.metrics = BotMetrics(bot)
+    bot.health.observers.append(bot.metrics.observe_backend)
+    bot.metrics.source(
+        "qcbot_log_queue_depth", "Log records waiting for the writer thread", lambda: qc_admin.log_pipeline.queue_depth
+    )
+    bot.metrics.source(
+        "qcbot_log_records_dropped_total",
+        "Log records dropped because the log queue was full",
+        lambda: qc_admin.log_pipeline.queue_handler.dropped,
+        kind="counter",
+    )
+    bot.metrics.source("qcbot_jobs_pending", "Jobs waiting for a job worker", lambda: bot.jobs.pending)
+    bot.metrics.source("qcbot_jobs_running", "Jobs running on a job worker", lambda: bot.jobs.running)
+    bot.metrics.source(
+        "qcbot_jobs_completed_total", "Jobs finished by the job workers", lambda: bot.jobs.completed, kind="counter"
+    )
+    try:
+        # entering the bot sets up its loop state, which the cogs' task loops need before login
+        async with bot:
+            await bot.add_cog(qc_admin)
+            qc_admin.cog_load_results = await load_extensions(bot, imported, bot.logger)
+            bot.snapshots.start(float(os.getenv("SNAPSHOT_INTERVAL_MINUTES", "10")) * 60)
+            metrics_port = os.getenv("METRICS_PORT")
+            await bot.metrics.start(os.getenv("METRICS_HOST", "127.0.0.1"), int(metrics_port) if metrics_port else None)
+            watchdog_threshold = float(os.getenv("WATCHDOG_THRESHOLD_MS", "250")) / 1000
+            if watchdog_threshold > 0:
+                watchdog_channel = os.getenv("WATCHDOG_CHANNEL_ID")
+                bot.watchdog = LoopWatchdog(
+                    bot,
+                    bot.logger.getChild("watchdog"),
+                    threshold=watchdog_threshold,
+                    channel_id=int(watchdog_channel) if watchdog_channel else None,
+                    report_seconds=float(os.getenv("WATCHDOG_REPORT_SECONDS", "60")),
+                )
+                bot.metrics.source(
+                    "qcbot_event_loop_stalls_total",
+                    "Callbacks that blocked the event loop longer than the watchdog threshold",
+                    lambda: bot.watchdog.total,
+                    kind="counter",
+                )
+                bot.watchdog.start()
+            await bot.start(os.getenv('DISCORD_API_TOKEN'))
+    finally:
+        # leaving the bot closed it, which unloaded the cogs, they saved their snapshot sections and logged their
+        # shutdown, so everything they use is only stopped now
+        if getattr(bot, "watchdog", None) is not None:
+            bot.watchdog.stop()
+        # saves whatever is still registered, e.g. sections of a cog that failed to unload
+        await bot.snapshots.stop()
+        await bot.metrics.stop()
+        bot.jobs.close()
+        # last, so it flushes every record logged during shutdown before the process exits
+        qc_admin.log_pipeline.stop()
 
-if __name__ == '__main__':
+
+def run_shard_process(shard_ids: list, index: int):
+    """Runs one bot process over the given shards, started by the launcher below"""
+    os.environ["SHARD_IDS"] = ",".join(str(shard_id) for shard_id in shard_ids)
+    # each process writes its own log file and serves its own metrics port
+    log_file, extension = os.path.splitext(os.getenv("LOG_FILE", "quantumly_confused_bot.log"))
+    os.environ["LOG_FILE"] = f"{log_file}.{index}{extension}"
+    metrics_port = os.getenv("METRICS_PORT")
+    if metrics_port:
+        os.environ["METRICS_PORT"] = str(int(metrics_port) + index)
     asyncio.run(main())
+
+
+if __name__ == '__main__':
+    shard_processes = int(os.getenv("SHARD_PROCESSES", "1"))
+    if shard_processes > 1 and not os.getenv("SHARD_IDS"):
+        if not os.getenv("SHARD_COUNT"):
+            raise ValueError("SHARD_PROCESSES needs SHARD_COUNT to be set")
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=run_shard_process, args=(shard_ids, index), name=f"qcbot-shards-{index}")
+            for index, shard_ids in enumerate(split_shards(int(os.getenv("SHARD_COUNT")), shard_processes))
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    else:
+        asyncio.run(main())